@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+
+from image_decode import DECODE_MODES, open_image
+
+def decode_and_resize(path, size, decode):
+    """Decode one image the way StableVITONDataset does and return (decoded, resized)"""
+    img = open_image(path, 'RGB', size, decode)
+    height, width = size
+    return img, img.resize((width, height), Image.BILINEAR)
+
+def peak_memory():
+    """Peak resident memory of this process in bytes, or None if it cannot be read.
+
+    Windows reports the peak working set through psutil (optional). Linux
+    reads VmHWM, which starts afresh for a spawned process, unlike
+    ru_maxrss, which carries the parent's high-water mark across exec. Other
+    platforms fall back to ru_maxrss (bytes on macOS).
+    """
+    if sys.platform == "win32":
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+        return None
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def bench(job):
+    """Time decode+resize over `paths` and report the process's peak memory.
+
+    Meant to run in a fresh worker process, so every mode starts from the
+    same interpreter state and the peak is that of this mode alone.
+    """
+    paths, size, decode, repeats = job
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for path in paths:
+            decode_and_resize(path, size, decode)
+    elapsed = time.perf_counter() - start
+    return elapsed / max(len(paths) * repeats, 1), peak_memory()
+
+def bench_isolated(paths, size, decode, repeats=1):
+    """Run bench in a freshly spawned process so modes do not share a memory high-water mark"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(bench, (paths, size, decode, repeats)).result()
+
+def baseline_rss():
+    """Peak memory of a worker that imports this module but decodes nothing"""
+    return bench_isolated([], None, "full")[1]
+
+def mean_abs_diff(paths, size):
+    """Mean absolute pixel difference of draft decoding against the full decode"""
+    diffs = []
+    for path in paths:
+        _, full = decode_and_resize(path, size, "full")
+        _, draft = decode_and_resize(path, size, "draft")
+        diffs.append(np.abs(np.asarray(full, dtype=np.int16) - np.asarray(draft, dtype=np.int16)).mean())
+    return float(np.mean(diffs))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark full vs draft JPEG decoding')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--folder', type=str, default='image', help='Modality folder to read')
+    parser.add_argument('--limit', type=int, default=200, help='Number of images to decode')
+    parser.add_argument('--repeats', type=int, default=1, help='Passes over the images per measurement')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    folder = os.path.join(args.data_root, args.folder)
+    if not os.path.exists(folder):
+        print(f"Error: Folder {folder} not found!")
+        return
+    paths = [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+             if f.lower().endswith(('.jpg', '.jpeg'))][:args.limit]
+    if not paths:
+        print(f"Error: No JPEG files found in {folder}")
+        return
+
+    print(f"Decoding {len(paths)} images from {folder}")
+    baseline = baseline_rss()
+    if baseline is None:
+        print("Peak memory is not available on this platform (install psutil on Windows)")
+    else:
+        print(f"Peak RSS of an idle worker: {baseline / 2**20:.1f} MiB")
+    for size in [(512, 384), (256, 192)]:
+        results = {decode: bench_isolated(paths, size, decode, args.repeats) for decode in DECODE_MODES}
+        full_time = results["full"][0]
+        print(f"\nTarget {size[0]}x{size[1]}:")
+        for decode, (per_image, peak_bytes) in results.items():
+            peak = f"{peak_bytes / 2**20:6.1f} MiB" if peak_bytes is not None else "   n/a"
+            print(f"  {decode:>5}: {per_image * 1000:7.2f} ms/image, "
+                  f"peak RSS {peak}, "
+                  f"speedup {full_time / per_image:4.2f}x")
+        print(f"  mean abs pixel diff (draft vs full): {mean_abs_diff(paths[:20], size):.2f}")
+
+if __name__ == "__main__":
+    main()
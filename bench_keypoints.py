@@ -0,0 +1,60 @@
+import os
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+from openpose import PARTS, KEYPOINTS_SUFFIX, read_keypoints, read_keypoints_json
+
+LOADERS = {"json.load": read_keypoints_json, "selective": read_keypoints}
+
+def bench(loader, paths, parts):
+    """Wall time to load every file, keeping the results as one stacked array per part"""
+    start = time.perf_counter()
+    results = [loader(path, parts) for path in paths]
+    elapsed = time.perf_counter() - start
+    return elapsed, {part: np.stack([r[part] for r in results]) for part in parts}
+
+def peak_memory(loader, paths, parts):
+    """Peak transient Python heap use (tracemalloc) of loading one file, over all files"""
+    tracemalloc.start()
+    for path in paths:
+        loader(path, parts)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark selective keypoint parsing against json.load')
+    parser.add_argument('--data_root', type=str, default='train', help='Path to data directory (train or test)')
+    parser.add_argument('--parts', type=str, nargs='+', default=['pose'], choices=list(PARTS), help='Keypoint parts to extract')
+    parser.add_argument('--limit', type=int, default=0, help='Only the first N files (0 for all)')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    folder = os.path.join(args.data_root, "openpose_json")
+    if not os.path.exists(folder):
+        print(f"Error: Folder {folder} not found!")
+        return
+    paths = [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.endswith(KEYPOINTS_SUFFIX)]
+    if args.limit:
+        paths = paths[:args.limit]
+    parts = tuple(args.parts)
+
+    print(f"Loading {', '.join(parts)} from {len(paths)} files in {folder}")
+    results = {}
+    for name, loader in LOADERS.items():
+        bench(loader, paths[:200], parts)  # warm the page cache
+        elapsed, arrays = bench(loader, paths, parts)
+        results[name] = (elapsed, peak_memory(loader, paths, parts), arrays)
+
+    base_time = results["json.load"][0]
+    for name, (elapsed, peak, _) in results.items():
+        print(f"  {name:>10}: {elapsed:6.2f} s, {elapsed / len(paths) * 1e6:7.1f} us/file, "
+              f"peak heap per file {peak / 2**10:7.1f} KiB, speedup {base_time / elapsed:4.2f}x")
+    same = all(np.array_equal(results["json.load"][2][part], results["selective"][2][part]) for part in parts)
+    print(f"  identical arrays: {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import time
+import argparse
+import numpy as np
+from PIL import Image
+
+from cloth_masks import cloth_masks, mask_image
+
+def loop_alpha_mask(img):
+    """The per-pixel getpixel/putpixel mask the try-on scripts used to build"""
+    img = img.convert('RGBA')
+    width, height = img.size
+    mask = Image.new('L', (width, height), 0)
+    for y in range(height):
+        for x in range(width):
+            r, g, b, a = img.getpixel((x, y))
+            if a > 100:
+                mask.putpixel((x, y), 255)
+    return mask
+
+def point_alpha_mask(img):
+    """The point(lambda) alpha mask stableviton_dataset_prep used to build"""
+    return img.convert('RGBA').split()[3].point(lambda i: 255 if i > 0 else 0)
+
+def synthetic_garments(count, size):
+    """RGBA garment-like ellipses on a transparent background"""
+    height, width = size
+    yy, xx = np.mgrid[:height, :width]
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        cy, cx = rng.uniform(0.4, 0.6) * height, rng.uniform(0.4, 0.6) * width
+        inside = ((yy - cy) / (0.35 * height)) ** 2 + ((xx - cx) / (0.3 * width)) ** 2 < 1
+        rgba = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+        rgba[..., 3] = np.where(inside, 255, 0)
+        images.append(Image.fromarray(rgba, 'RGBA'))
+    return images
+
+def bench(fn, images):
+    start = time.perf_counter()
+    results = [fn(img) for img in images]
+    return (time.perf_counter() - start) / len(images), results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark vectorised cloth masks against the per-pixel loops')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--folder', type=str, default='cloth', help='Garment folder to read')
+    parser.add_argument('--limit', type=int, default=200, help='Number of images for the vectorised paths')
+    parser.add_argument('--loop_limit', type=int, default=5, help='Number of images for the (slow) pixel loop')
+    parser.add_argument('--synthetic', type=int, default=0, help='Use N synthetic 1024x768 RGBA garments instead of a folder')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.synthetic:
+        images = synthetic_garments(args.synthetic, (1024, 768))
+        source = f"{len(images)} synthetic garments"
+    else:
+        folder = os.path.join(args.data_root, args.folder)
+        if not os.path.exists(folder):
+            print(f"Error: Folder {folder} not found!")
+            return
+        paths = [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+                 if f.lower().endswith(('.jpg', '.jpeg', '.png'))][:args.limit]
+        if not paths:
+            print(f"Error: No images found in {folder}")
+            return
+        images = [Image.open(p) for p in paths]
+        for img in images:
+            img.load()
+        source = f"{len(images)} images from {folder}"
+
+    print(f"Masking {source}")
+    loop_time, loop_masks = bench(loop_alpha_mask, images[:args.loop_limit])
+    point_time, point_masks = bench(point_alpha_mask, images)
+    vector_time, vector_masks = bench(lambda img: mask_image(img, "alpha"), images)
+    same = all(np.array_equal(np.asarray(a), np.asarray(b)) for a, b in zip(loop_masks, vector_masks))
+    # stableviton_dataset_prep thresholds alpha at 0 rather than 100
+    _, prep_masks = bench(lambda img: mask_image(img, "alpha", alpha_threshold=0), images)
+    same_point = all(np.array_equal(np.asarray(a), np.asarray(b)) for a, b in zip(point_masks, prep_masks))
+
+    # Batch API over one stacked (N, H, W, 4) array, where the images share a size
+    batch_time = None
+    if len({img.size for img in images}) == 1:
+        batch = np.stack([np.asarray(img.convert('RGBA')) for img in images])
+        start = time.perf_counter()
+        cloth_masks(batch, "alpha")
+        batch_time = (time.perf_counter() - start) / len(images)
+    largest_time, _ = bench(lambda img: mask_image(img, "largest"), images)
+
+    print(f"  getpixel loop:   {loop_time * 1000:9.2f} ms/image ({min(args.loop_limit, len(images))} images)")
+    print(f"  point(lambda):   {point_time * 1000:9.2f} ms/image, speedup {loop_time / point_time:7.1f}x")
+    print(f"  vectorised:      {vector_time * 1000:9.2f} ms/image, speedup {loop_time / vector_time:7.1f}x")
+    if batch_time is not None:
+        print(f"  batched:         {batch_time * 1000:9.2f} ms/image, speedup {loop_time / batch_time:7.1f}x")
+    print(f"  largest (cv2):   {largest_time * 1000:9.2f} ms/image, speedup {loop_time / largest_time:7.1f}x")
+    print(f"  vectorised alpha mask identical to the loop: {same}")
+    print(f"  threshold-0 alpha mask identical to point(lambda): {same_point}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+import tqdm
+
+from sample_store import ensure_dir
+
+STRATEGIES = ("auto", "alpha", "white", "largest")
+ALPHA_THRESHOLD = 100
+WHITE_THRESHOLD = 240
+MASK_MANIFEST = ".cloth_masks.json"
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+def has_alpha(images):
+    """Per-image flag: True where a (..., H, W, 4) array has any non-opaque pixel"""
+    if images.shape[-1] != 4:
+        return np.zeros(images.shape[:-3], dtype=bool)
+    return images[..., 3].min(axis=(-2, -1)) < 255
+
+def alpha_mask(images, threshold=ALPHA_THRESHOLD):
+    """Foreground where alpha > threshold; images without alpha are all foreground"""
+    if images.shape[-1] != 4:
+        return np.ones(images.shape[:-1], dtype=bool)
+    return images[..., 3] > threshold
+
+def white_background_mask(images, threshold=WHITE_THRESHOLD):
+    """Foreground where any RGB channel is <= threshold (i.e. not background white)"""
+    return (images[..., :3] <= threshold).any(axis=-1)
+
+def largest_component(mask):
+    """Keep only the largest 8-connected foreground component of an (H, W) bool mask"""
+    import cv2
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+    if count <= 2:
+        return mask
+    return labels == 1 + np.argmax(stats[1:, cv2.CC_STAT_AREA])
+
+def cloth_masks(images, strategy="auto", alpha_threshold=ALPHA_THRESHOLD, white_threshold=WHITE_THRESHOLD):
+    """Garment masks for an (H, W, C) image or an (N, H, W, C) batch of uint8 arrays.
+
+    Strategies:
+        alpha: alpha > alpha_threshold
+        white: anything that is not near-white background
+        auto: alpha for images with transparency, white otherwise
+        largest: auto, then only the largest connected component
+    Returns:
+        bool array of shape (H, W) or (N, H, W)
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {STRATEGIES}, got {strategy!r}")
+    images = np.asarray(images)
+    if strategy == "alpha":
+        return alpha_mask(images, alpha_threshold)
+    if strategy == "white":
+        return white_background_mask(images, white_threshold)
+
+    use_alpha = has_alpha(images)
+    masks = white_background_mask(images, white_threshold)
+    if use_alpha.any():
+        masks = np.where(use_alpha[..., None, None], alpha_mask(images, alpha_threshold), masks)
+    if strategy == "largest":
+        if masks.ndim == 2:
+            return largest_component(masks)
+        return np.stack([largest_component(m) for m in masks])
+    return masks
+
+def mask_image(img, strategy="auto", **kwargs):
+    """Garment mask of a PIL image as an 'L' image (0 / 255)"""
+    mode = "RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB"
+    mask = cloth_masks(np.asarray(img.convert(mode)), strategy, **kwargs)
+    return Image.fromarray(mask.astype(np.uint8) * 255)
+
+def save_cloth_mask(image_path, output_path, strategy="auto", **kwargs):
+    """Compute and save the mask of one garment image; returns the 'L' mask"""
+    with Image.open(image_path) as img:
+        mask = mask_image(img, strategy, **kwargs)
+    mask.save(output_path)
+    return mask
+
+def file_hash(path):
+    """blake2b digest of a file's contents"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def mask_job(job):
+    """Pool worker: (src, dst, previous hash, settings) -> (name, hash, regenerated, error)
+
+    A garment that cannot be read or masked comes back with hash None and the
+    error message instead of raising, so one bad file does not stop the run.
+    """
+    src, dst, previous_hash, settings = job
+    name = os.path.basename(src)
+    try:
+        digest = file_hash(src)
+        if digest == previous_hash and os.path.exists(dst):
+            return name, digest, False, None
+        with Image.open(src) as img:
+            mask = mask_image(img, settings["strategy"], alpha_threshold=settings["alpha_threshold"],
+                              white_threshold=settings["white_threshold"])
+        mask.save(dst, quality=95)
+        return name, digest, True, None
+    except Exception as e:
+        return name, None, False, str(e)
+
+def update_cloth_masks(cloth_dir, mask_dir, strategy="auto", alpha_threshold=ALPHA_THRESHOLD,
+                       white_threshold=WHITE_THRESHOLD, workers=None, force=False):
+    """Regenerate the masks in mask_dir for garments in cloth_dir that changed since the last run.
+
+    ``<mask_dir>/.cloth_masks.json`` records each garment's mtime, size and
+    content hash and the mask settings. A garment is skipped when its
+    mtime/size are unchanged and its mask exists; when only the mtime or size
+    moved, the hash is compared before re-masking. Changing the settings (or
+    force) regenerates everything.
+    """
+    ensure_dir(mask_dir)
+    settings = {"strategy": strategy, "alpha_threshold": alpha_threshold, "white_threshold": white_threshold}
+    manifest_path = os.path.join(mask_dir, MASK_MANIFEST)
+    entries = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("settings") == settings:
+            entries = manifest["entries"]
+
+    jobs = []
+    current = {}
+    with os.scandir(cloth_dir) as it:
+        for entry in it:
+            if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTS):
+                continue
+            st = entry.stat()
+            stamp = [st.st_mtime_ns, st.st_size]
+            previous = entries.get(entry.name)
+            dst = os.path.join(mask_dir, entry.name)
+            if previous is not None and previous[:2] == stamp and os.path.exists(dst):
+                current[entry.name] = previous
+                continue
+            current[entry.name] = stamp + [None]
+            jobs.append((entry.path, dst, previous[2] if previous else None, settings))
+
+    print(f"{len(current)} garments in {cloth_dir}, {len(jobs)} new or changed")
+    made = 0
+    failed = []
+    try:
+        if jobs:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(mask_job, jobs, chunksize=16)
+                for name, digest, regenerated, error in tqdm.tqdm(results, total=len(jobs), desc="masks"):
+                    if error is not None:
+                        failed.append((name, error))
+                        continue
+                    current[name][2] = digest
+                    made += regenerated
+    finally:
+        # Record whatever finished, so an interrupted run resumes where it stopped
+        done = {name: entry for name, entry in current.items() if entry[2] is not None}
+        with open(manifest_path, "w") as f:
+            json.dump({"settings": settings, "entries": done}, f)
+    print(f"Wrote {made} masks to {mask_dir} ({len(jobs) - made - len(failed)} touched but unchanged)")
+    if failed:
+        # Failed garments stay out of the manifest, so the next run retries them
+        print(f"Error: {len(failed)} garments could not be masked:")
+        for name, error in failed:
+            print(f"  {name}: {error}")
+    return made
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Regenerate cloth masks for new or changed garments')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--cloth_dir', type=str, default='cloth', help='Garment folder under --data_root')
+    parser.add_argument('--mask_dir', type=str, default='cloth-mask', help='Mask folder under --data_root')
+    parser.add_argument('--strategy', type=str, default='auto', choices=STRATEGIES, help='Mask strategy')
+    parser.add_argument('--alpha_threshold', type=int, default=ALPHA_THRESHOLD, help='Alpha above this is garment')
+    parser.add_argument('--white_threshold', type=int, default=WHITE_THRESHOLD, help='RGB above this on every channel is background')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Regenerate every mask')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    cloth_dir = os.path.join(args.data_root, args.cloth_dir)
+    if not os.path.exists(cloth_dir):
+        print(f"Error: Garment directory {cloth_dir} not found!")
+        return
+    update_cloth_masks(cloth_dir, os.path.join(args.data_root, args.mask_dir), args.strategy,
+                       args.alpha_threshold, args.white_threshold, args.workers, args.force)
+
+if __name__ == "__main__":
+    main()
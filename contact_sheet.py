@@ -0,0 +1,231 @@
+import os
+import json
+import html
+import argparse
+import numpy as np
+import tqdm
+from PIL import Image
+
+from grid_compositor import compose_grid, fit_panel, grid_layout
+from sample_store import MODALITIES, ensure_dir
+from pair_table import read_pairs
+
+THUMB_INDEX = "thumbs.json"
+THUMB_DATA = "thumbs.bin"
+SHEET_INDEX = "index.html"
+RESULT_EXTS = (".jpg", ".png")
+
+# Sheet layout; the HTML index relies on grid_layout reproducing it
+LABEL_SIZE = 11
+TITLE_SIZE = 18
+PADDING = 6
+
+class ThumbnailCache:
+    """Append-only store of downscaled thumbnails keyed by source path.
+
+    Thumbnails are (H, W, 3) uint8 rows appended to one raw ``thumbs.bin``.
+    ``thumbs.json`` maps each absolute source path to its row and the
+    (mtime_ns, size) it was made from, so a thumbnail is only regenerated
+    when its source changes. Superseded rows are left in place as dead space.
+    Rows are numbered by this instance and the index is rewritten on save, so
+    a cache directory must have one writer at a time. Rows appended after the
+    last save (e.g. by a run that crashed) are cut off on open. New thumbnails
+    are held in memory only until the next flush, which maps them from disk.
+    """
+
+    def __init__(self, cache_dir, size=(128, 96)):
+        ensure_dir(cache_dir)
+        self.size = tuple(size)
+        self.row_bytes = self.size[0] * self.size[1] * 3
+        self.index_path = os.path.join(cache_dir, THUMB_INDEX)
+        self.data_path = os.path.join(cache_dir, THUMB_DATA)
+        self.entries = {}
+        self.rows = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                meta = json.load(f)
+            data_bytes = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+            if tuple(meta["size"]) == self.size and data_bytes >= meta["rows"] * self.row_bytes:
+                self.entries = meta["entries"]
+                self.rows = meta["rows"]
+                if data_bytes > self.rows * self.row_bytes:
+                    os.truncate(self.data_path, self.rows * self.row_bytes)
+        if self.rows == 0:
+            self.entries = {}
+            open(self.data_path, "wb").close()
+        self.fresh = {}
+        self.flush()
+        self.made = 0
+        self.reused = 0
+        self.failed = 0
+
+    def flush(self):
+        """Serve every row appended so far from the data file and drop the in-memory copies"""
+        self.stored = np.memmap(self.data_path, dtype=np.uint8, mode="r",
+                                shape=(self.rows,) + self.size + (3,)) if self.rows else None
+        self.fresh.clear()
+
+    def get(self, path):
+        """Thumbnail of the image at path, or None if it does not exist or cannot be read"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = os.path.abspath(path)
+        stamp = [st.st_mtime_ns, st.st_size]
+        entry = self.entries.get(key)
+        if entry is not None and entry[1:] == stamp:
+            self.reused += 1
+            row = entry[0]
+            return self.fresh[row] if row in self.fresh else np.asarray(self.stored[row])
+
+        try:
+            with Image.open(path) as img:
+                thumb = fit_panel(img, self.size)
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            self.failed += 1
+            return None
+        with open(self.data_path, "ab") as f:
+            f.write(thumb.tobytes())
+        self.fresh[self.rows] = thumb
+        self.entries[key] = [self.rows] + stamp
+        self.rows += 1
+        self.made += 1
+        return thumb
+
+    def save(self):
+        with open(self.index_path, "w") as f:
+            json.dump({"size": list(self.size), "rows": self.rows, "entries": self.entries}, f)
+
+def result_lookup(results_dir):
+    """Map file stem -> path for the result images in a directory (one listing)"""
+    if not results_dir or not os.path.isdir(results_dir):
+        return {}
+    return {os.path.splitext(fn)[0]: os.path.join(results_dir, fn)
+            for fn in os.listdir(results_dir) if fn.lower().endswith(RESULT_EXTS)}
+
+def find_result(results, img_fn, cloth_fn):
+    """Result for a pair, saved as <image>_<cloth> or just <image>; None if absent"""
+    im, c = os.path.splitext(img_fn)[0], os.path.splitext(cloth_fn)[0]
+    return results.get(f"{im}_{c}") or results.get(im)
+
+def url(path, output_dir):
+    return html.escape(os.path.relpath(path, output_dir).replace(os.sep, "/"), quote=True)
+
+def write_contact_sheets(entries, column_labels, output_dir, cache_dir=None, per_page=60,
+                         entries_per_row=4, thumb_size=(128, 96), prefix="sheet", title="Contact sheet",
+                         index_name=SHEET_INDEX):
+    """Tile entries into paged JPEG sheets plus a static ``index.html``.
+
+    Args:
+        entries: (name, [path or None, ...]) per entry, one path per column
+        column_labels: Caption for each column, used where a path is missing
+        output_dir: Where sheets and index.html are written
+        cache_dir: Thumbnail cache (default: <output_dir>/.thumbs); give concurrent
+            writers into one output_dir a directory each
+        per_page: Entries per sheet
+        entries_per_row: Entries side by side on a sheet
+        prefix, index_name: Sheet file prefix and HTML file name, so several
+            runs can share one output directory
+    Returns:
+        List of sheet paths
+    """
+    ensure_dir(output_dir)
+    cache = ThumbnailCache(cache_dir or os.path.join(output_dir, ".thumbs"), thumb_size)
+    per_entry = len(column_labels)
+    columns = per_entry * entries_per_row
+    pages = [entries[i:i + per_page] for i in range(0, len(entries), per_page)]
+
+    sheets = []
+    rows_html = []
+    # Save the index even if a page fails, so the rows appended so far stay usable
+    try:
+        for page_number, page in enumerate(tqdm.tqdm(pages, desc="sheets")):
+            page_title = f"{title} - page {page_number + 1}/{len(pages)}"
+            panels, labels = [], []
+            for name, paths in page:
+                for label, path in zip(column_labels, paths):
+                    thumb = cache.get(path) if path else None
+                    panels.append(thumb if thumb is not None else f"no {label}")
+                    labels.append(os.path.splitext(os.path.basename(path))[0] if thumb is not None else label)
+            sheet_name = f"{prefix}_{page_number:04d}.jpg"
+            sheet_path = os.path.join(output_dir, sheet_name)
+            layout = dict(columns=columns, title=page_title, padding=PADDING, label_size=LABEL_SIZE, title_size=TITLE_SIZE)
+            compose_grid(panels, labels, panel_size=thumb_size, **layout).save(sheet_path, quality=90)
+            sheets.append(sheet_path)
+            cache.flush()
+
+            # Each index row shows its entry by cropping the sheet with a CSS background offset
+            _, origins = grid_layout(thumb_size, len(panels), **layout)
+            crop_w = per_entry * (thumb_size[1] + PADDING) - PADDING
+            crop_h = LABEL_SIZE + PADDING + thumb_size[0]
+            rows_html.append(f'<tr><th colspan="{per_entry + 2}"><a href="{sheet_name}">{html.escape(page_title)}</a></th></tr>')
+            for k, (name, paths) in enumerate(page):
+                x, y = origins[k * per_entry]
+                links = "".join(f'<td><a href="{url(p, output_dir)}">{html.escape(os.path.basename(p))}</a></td>'
+                                if p else "<td>-</td>" for p in paths)
+                rows_html.append(
+                    f'<tr id="{html.escape(name, quote=True)}"><td>{html.escape(name)}</td>'
+                    f'<td><a href="{sheet_name}"><div class="crop" style="width:{crop_w}px;height:{crop_h}px;'
+                    f'background-image:url({sheet_name});background-position:-{x}px -{y}px"></div></a></td>{links}</tr>')
+    finally:
+        cache.save()
+
+    header = "".join(f"<th>{html.escape(label)}</th>" for label in column_labels)
+    with open(os.path.join(output_dir, index_name), "w", encoding="utf-8") as f:
+        f.write(f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>body{{font-family:sans-serif}} td,th{{padding:2px 6px;text-align:left}} .crop{{background-repeat:no-repeat}}</style>
+</head><body>
+<h1>{html.escape(title)}</h1>
+<p>{len(entries)} entries on {len(sheets)} sheets</p>
+<table><tr><th>#</th><th>preview</th>{header}</tr>
+{chr(10).join(rows_html)}
+</table></body></html>
+""")
+    print(f"Wrote {len(sheets)} sheets and {index_name} to {output_dir} "
+          f"({cache.made} thumbnails made, {cache.reused} reused, {cache.failed} unreadable)")
+    return sheets
+
+def pair_entries(data_root, pairs, results_dir=None, folders=("image", "cloth"), indices=None):
+    """Contact sheet entries for dataset pairs: one column per folder plus the result, if results_dir is given"""
+    results = result_lookup(results_dir)
+    entries = []
+    for i in (range(len(pairs)) if indices is None else indices):
+        img_fn, cloth_fn = pairs[i]
+        paths = [os.path.join(data_root, folder, img_fn if MODALITIES[folder][0] == "image" else cloth_fn)
+                 for folder in folders]
+        if results_dir:
+            paths.append(find_result(results, img_fn, cloth_fn))
+        entries.append((str(i + 1), paths))
+    return entries
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Tile (person, cloth, result) triplets into contact sheets with an HTML index')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--pairs_file', type=str, default='test_pairs.txt', help='Path to pairs file')
+    parser.add_argument('--results_dir', type=str, default=None, help='Directory of try-on results named <image>_<cloth>.jpg/png')
+    parser.add_argument('--output_dir', type=str, default='contact_sheets', help='Directory to write sheets to')
+    parser.add_argument('--num_pairs', type=int, default=0, help='Only the first N pairs (0 for all)')
+    parser.add_argument('--per_page', type=int, default=60, help='Pairs per sheet')
+    parser.add_argument('--per_row', type=int, default=4, help='Pairs side by side on a sheet')
+    parser.add_argument('--thumb_height', type=int, default=128, help='Thumbnail height in pixels')
+    parser.add_argument('--thumb_width', type=int, default=96, help='Thumbnail width in pixels')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.data_root):
+        print(f"Error: Data directory {args.data_root} not found!")
+        return
+    pairs = read_pairs(args.pairs_file)
+    if args.num_pairs:
+        pairs = pairs[:args.num_pairs]
+    entries = pair_entries(args.data_root, pairs, args.results_dir)
+    labels = ["person", "cloth"] + (["result"] if args.results_dir else [])
+    write_contact_sheets(entries, labels, args.output_dir, per_page=args.per_page, entries_per_row=args.per_row,
+                         thumb_size=(args.thumb_height, args.thumb_width), title=f"{args.data_root} pairs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import json
+
+MANIFEST_FILE = ".manifest.json"
+
+def scan_folder(path):
+    """List the regular files in a folder with a single os.scandir pass"""
+    names = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file():
+                names.append(entry.name)
+    return names
+
+def folder_mtime(path):
+    """Return a folder's mtime in nanoseconds, or None if it doesn't exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+class DatasetManifest:
+    """File inventory of a data root, built with one scandir pass per folder.
+
+    The listing is cached in ``<data_root>/.manifest.json`` together with each
+    folder's mtime. Adding or removing files bumps a folder's mtime, so only
+    folders that changed since the last run are rescanned.
+    """
+
+    def __init__(self, data_root, folders, cache_path=None):
+        self.data_root = data_root
+        self.cache_path = cache_path or os.path.join(data_root, MANIFEST_FILE)
+        self.files = {}
+
+        cached = self._read_cache()
+        dirty = False
+        for folder in folders:
+            folder_path = os.path.join(data_root, folder)
+            mtime = folder_mtime(folder_path)
+            entry = cached.get(folder)
+            if entry is not None and entry["mtime"] == mtime:
+                names = entry["names"]
+            else:
+                names = scan_folder(folder_path) if mtime is not None else []
+                cached[folder] = {"mtime": mtime, "names": sorted(names)}
+                dirty = True
+            self.files[folder] = frozenset(names)
+
+        if dirty:
+            self._write_cache(cached)
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, cached):
+        try:
+            with open(self.cache_path, "w") as f:
+                json.dump(cached, f)
+        except OSError as e:
+            print(f"Warning: could not write manifest cache {self.cache_path}: {e}")
+
+    def has(self, folder, name):
+        return name in self.files.get(folder, ())
+
+    def count(self, folder):
+        return len(self.files.get(folder, ()))
@@ -1,15 +1,103 @@
 import os
+import io
+import random
 import argparse
+import time
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import numpy as np
 from PIL import Image
 import matplotlib.pyplot as plt
 import torch
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, IterableDataset, DataLoader, Subset, get_worker_info
 from torchvision import transforms
 import tqdm
 
-class StableVITONDataset(Dataset):
-    def __init__(self, data_root_dir, pairs_file, img_size=(512, 384), is_test=False):
+from sample_store import MODALITIES, PackedSampleStore
+from mask_store import MaskStore
+from dataset_manifest import DatasetManifest
+from pair_table import PairTable
+from image_decode import DECODE_MODES, open_image
+from sample_cache import make_cache
+from tar_shards import read_shard_index, iter_shard, split_field
+from pair_sharding import add_shard_args, shard_pairs
+from grid_compositor import save_grid
+from contact_sheet import pair_entries, write_contact_sheets
+from openpose import keypoints_name, parse_keypoints, read_pose
+from keypoint_index import KeypointIndex
+from pose_heatmaps import LATENT_STRIDE, render_heatmaps
+
+# Modalities without which a sample is incomplete (a missing cloth mask falls back to all-ones)
+REQUIRED_MODALITIES = ("image", "cloth", "agnostic-v3.2", "image-densepose")
+
+# Sample fields normalised to [-1, 1] and to [0, 1] respectively
+RGB_KEYS = ("image", "cloth", "agnostic", "densepose")
+MASK_KEYS = ("cloth_mask",)
+
+# Panels of a sample visualisation, in grid order
+PANEL_LABELS = ("Person Image", "Cloth Image", "Cloth Mask", "Agnostic", "DensePose", "Virtual Try-On")
+RESULT_PLACEHOLDER = "Virtual Try-On\n(Simulated Result)"
+
+# Modality folder -> sample field
+SAMPLE_KEYS = {
+    "image": "image",
+    "cloth": "cloth",
+    "cloth-mask": "cloth_mask",
+    "agnostic-v3.2": "agnostic",
+    "image-densepose": "densepose",
+}
+
+class SampleTensorMixin:
+    """Tensor conversion shared by the map-style and streaming datasets.
+    
+    Expects `img_size` and `uint8` attributes on the dataset, and
+    `pose_heatmaps` and `heatmap_size` for the optional pose field.
+    """
+    
+    def _from_array(self, array, is_mask=False):
+        """Turn a resized (H, W, C) uint8 array into the tensor this dataset returns."""
+        tensor = torch.from_numpy(array).permute(2, 0, 1)
+        if self.uint8:
+            return tensor
+        tensor = tensor.float().div_(255)
+        if not is_mask:
+            tensor = tensor.sub_(0.5).div_(0.5)
+        return tensor
+    
+    def _blank(self, is_mask=False):
+        """Fallback tensor for a missing modality: all-ones masks, zero (grey) images."""
+        channels = 1 if is_mask else 3
+        if self.uint8:
+            return torch.full((channels, *self.img_size), 255 if is_mask else 128, dtype=torch.uint8)
+        if is_mask:
+            return torch.ones((channels, *self.img_size))
+        return torch.zeros((channels, *self.img_size))
+    
+    def _heatmaps(self, pose):
+        """(25, H, W) joint heatmaps for a (25, 3) pose, uint8 0-255 or float 0-1 like masks."""
+        size = self.heatmap_size or tuple(s // LATENT_STRIDE for s in self.img_size)
+        heatmaps = render_heatmaps(pose, size,
+                                   dtype=np.uint8 if self.uint8 else np.float32)
+        return torch.from_numpy(heatmaps)
+    
+    def _make_sample(self, pair_index, img_fn, cloth_fn, tensors):
+        """Build the sample dict from {folder: tensor or None}, filling in fallbacks."""
+        sample = {'pair_index': pair_index}
+        for folder, key in SAMPLE_KEYS.items():
+            tensor = tensors.get(folder)
+            sample[key] = tensor if tensor is not None else self._blank(is_mask=key in MASK_KEYS)
+        sample['image_name'] = img_fn
+        sample['cloth_name'] = cloth_fn
+        return sample
+
+class StableVITONDataset(SampleTensorMixin, Dataset):
+    def __init__(self, data_root_dir, pairs_file, img_size=(512, 384), is_test=False, packed_dir=None,
+                 manifest_cache=None, skip_missing=False, decode="full",
+                 uint8=False, cache_bytes=0, shared_cache=False, mask_store=None,
+                 pose_heatmaps=False, heatmap_size=None, keypoint_index=None):
         """Dataset for StableVITON virtual try-on.
         
         Args:
@@ -17,26 +105,74 @@ class StableVITONDataset(Dataset):
             pairs_file: Path to the pairs file (train_pairs.txt or test_pairs.txt)
             img_size: Tuple of (height, width) for resizing images
             is_test: Whether this is a test dataset
+            packed_dir: Optional directory written by sample_store.py; samples are
+                read from its memory-mapped shards instead of decoding JPEGs
+            manifest_cache: Path of the file inventory cache (defaults to
+                <data_root_dir>/.manifest.json)
+            skip_missing: Drop pairs missing any of REQUIRED_MODALITIES while
+                building the index, so they are never loaded
+            decode: "full" decodes JPEGs at full resolution before resizing;
+                "draft" lets the JPEG decoder downscale by 1/2, 1/4 or 1/8 first
+            uint8: Return resized uint8 CHW tensors and leave normalisation to
+                normalize_batch, so workers ship a quarter of the bytes. Missing
+                RGB modalities are filled with 128 (~0 after normalisation)
+            cache_bytes: Byte budget of an LRU cache of decoded, resized
+                modalities keyed by (modality, filename, size); 0 disables it
+            shared_cache: Back the cache with shared memory so DataLoader
+                workers share hits instead of each keeping its own cache
+            mask_store: Optional file written by mask_store.py; cloth masks
+                are decoded from it instead of cloth-mask/*.jpg
+            pose_heatmaps: Add a 'pose' field of 25 Gaussian joint heatmaps
+                built from openpose_json (all zero for a missing file)
+            heatmap_size: (height, width) of the heatmaps, defaults to the latent
+                size img_size // 8; full-size float32 heatmaps are ~19 MiB per
+                sample at 512x384
+            keypoint_index: Optional directory written by keypoint_index.py;
+                poses are read from its arrays instead of parsing JSON
         """
+        if decode not in DECODE_MODES:
+            raise ValueError(f"Unknown decode mode {decode!r}, expected one of {DECODE_MODES}")
         self.data_root = data_root_dir
         self.img_size = img_size
         self.is_test = is_test
+        self.decode = decode
+        self.uint8 = uint8
+        self.cache = make_cache(cache_bytes, img_size, shared=shared_cache)
+        
+        self.store = None
+        if packed_dir is not None:
+            self.store = PackedSampleStore(packed_dir)
+            if self.store.img_size != tuple(img_size):
+                raise ValueError(f"Packed store {packed_dir} was built at {self.store.img_size}, "
+                                 f"dataset expects {tuple(img_size)}")
+        
+        self.mask_store = MaskStore(mask_store) if mask_store is not None else None
+        
+        self.pose_heatmaps = pose_heatmaps
+        self.heatmap_size = heatmap_size
+        self.keypoints = KeypointIndex(keypoint_index) if keypoint_index is not None else None
         
-        # Read pairs file
-        self.im_names = []
-        self.c_names = []
+        # One scandir pass per modality folder instead of a stat per sample
+        self.manifest = None
+        if self.store is None:
+            self.manifest = DatasetManifest(data_root_dir, MODALITIES, cache_path=manifest_cache)
+        
+        # Read pairs file into an array-backed table that workers share without copying
+        self.pairs = PairTable()
         try:
-            with open(pairs_file, "r") as f:
-                for line in f.readlines():
-                    im_name, c_name = line.strip().split()
-                    self.im_names.append(im_name)
-                    self.c_names.append(c_name)
-            print(f"Successfully loaded {len(self.im_names)} pairs from {pairs_file}")
+            self.pairs = PairTable.from_file(pairs_file)
+            print(f"Successfully loaded {len(self.pairs)} pairs from {pairs_file}")
         except FileNotFoundError:
             print(f"Warning: Pairs file {pairs_file} not found!")
         except Exception as e:
             print(f"Error reading pairs file: {e}")
         
+        # Check every pair against the file inventory before any decoding
+        self.completeness, complete = self._check_completeness()
+        if skip_missing:
+            self.pairs = self.pairs.select(complete)
+            print(f"Skipping {len(complete) - len(self.pairs)} incomplete pairs")
+        
         # Define transformations
         self.transform = transforms.Compose([
             transforms.Resize(img_size),
@@ -50,75 +186,230 @@ class StableVITONDataset(Dataset):
         ])
     
     def __len__(self):
-        return len(self.im_names)
+        return len(self.pairs)
     
-    def __getitem__(self, idx):
-        img_fn = self.im_names[idx]
-        cloth_fn = self.c_names[idx]
+    def _has(self, folder, fn):
+        if folder == "cloth-mask" and self.mask_store is not None:
+            return self.mask_store.has(fn)
+        if self.store is not None:
+            return self.store.has(folder, fn)
+        return self.manifest.has(folder, fn)
+    
+    def _check_completeness(self):
+        """Count present files per modality and flag pairs with all required modalities."""
+        report = {}
+        complete = np.ones(len(self.pairs), dtype=bool)
+        for folder, (column, _) in MODALITIES.items():
+            ids = self.pairs.column(column)
+            name_present = np.zeros(self.pairs.num_names, dtype=bool)
+            for name_id in np.unique(ids):
+                name_present[name_id] = self._has(folder, self.pairs.name(name_id))
+            present = name_present[ids]
+            report[folder] = (int(present.sum()), len(present))
+            if folder in REQUIRED_MODALITIES:
+                complete &= present
+        return report, complete
+    
+    def print_completeness(self):
+        print("Modality completeness:")
+        for folder, (present, total) in self.completeness.items():
+            print(f"  {folder}: {present}/{total} present, {total - present} missing")
+    
+    def _decode(self, folder, fn, path, is_mask=False):
+        """Decode and resize one file to a (H, W, C) uint8 array, going through the cache."""
+        key = (folder, fn, tuple(self.img_size))
+        if self.cache is not None:
+            array = self.cache.get(key)
+            if array is not None:
+                return array
+        height, width = self.img_size
+        img = open_image(path, 'L' if is_mask else 'RGB', self.img_size, self.decode)
+        img = img.resize((width, height), Image.BILINEAR)
+        array = np.array(img).reshape(height, width, -1)
+        if self.cache is not None:
+            self.cache.put(key, array)
+        return array
+    
+    def _load_packed(self, folder, fn, is_mask=False):
+        array = self.store.get(folder, fn)
+        if array is None:
+            return None
+        return self._from_array(array, is_mask)
+    
+    def _load_stored_mask(self, fn):
+        mask = self.mask_store.get(fn, np.uint8)
+        if mask is None:
+            return None
+        height, width = self.img_size
+        if mask.shape != (height, width):
+            mask = np.array(Image.fromarray(mask).resize((width, height), Image.BILINEAR))
+        return self._from_array(mask[:, :, None], is_mask=True)
+    
+    def _load(self, folder, fn, is_mask=False, required=False):
+        """Load one modality as a transformed tensor, or None if it is unavailable."""
+        if folder == "cloth-mask" and self.mask_store is not None:
+            return self._load_stored_mask(fn)
+        if self.store is not None:
+            return self._load_packed(folder, fn, is_mask)
         
-        # Load image
-        image_path = os.path.join(self.data_root, "image", img_fn)
+        path = os.path.join(self.data_root, folder, fn)
+        if not self.manifest.has(folder, fn):
+            if required:
+                print(f"Error loading {folder} {path}: file not found")
+            return None
         try:
-            image = Image.open(image_path).convert('RGB')
-            image_tensor = self.transform(image)
+            if self.uint8 or self.cache is not None:
+                return self._from_array(self._decode(folder, fn, path, is_mask), is_mask)
+            img = open_image(path, 'L' if is_mask else 'RGB', self.img_size, self.decode)
+            if is_mask:
+                return self.mask_transform(img)
+            return self.transform(img)
         except Exception as e:
-            print(f"Error loading image {image_path}: {e}")
-            image_tensor = torch.zeros((3, *self.img_size))
-        
-        # Load cloth
-        cloth_path = os.path.join(self.data_root, "cloth", cloth_fn)
+            print(f"Error loading {folder} {path}: {e}")
+            return None
+    
+    def _load_pose(self, img_fn):
+        """(25, 3) OpenPose keypoints of a person, zeros if unavailable."""
+        if self.keypoints is not None:
+            pose = self.keypoints.get(img_fn)
+            if pose is not None:
+                return pose
+        path = os.path.join(self.data_root, "openpose_json", keypoints_name(img_fn))
         try:
-            cloth = Image.open(cloth_path).convert('RGB')
-            cloth_tensor = self.transform(cloth)
-        except Exception as e:
-            print(f"Error loading cloth {cloth_path}: {e}")
-            cloth_tensor = torch.zeros((3, *self.img_size))
+            return read_pose(path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error loading openpose_json {path}: {e}")
+        return np.zeros((25, 3), dtype=np.float32)
+    
+    def __getitem__(self, idx):
+        img_fn, cloth_fn = self.pairs[idx]
         
-        # Load cloth mask
-        cloth_mask_path = os.path.join(self.data_root, "cloth-mask", cloth_fn)
-        try:
-            if os.path.exists(cloth_mask_path):
-                cloth_mask = Image.open(cloth_mask_path).convert('L')
-                cloth_mask_tensor = self.mask_transform(cloth_mask)
-            else:
-                cloth_mask_tensor = torch.ones((1, *self.img_size))
-        except Exception as e:
-            print(f"Error loading cloth mask {cloth_mask_path}: {e}")
-            cloth_mask_tensor = torch.ones((1, *self.img_size))
+        sample = self._make_sample(idx, img_fn, cloth_fn, {
+            folder: self._load(folder, fn, is_mask=SAMPLE_KEYS[folder] in MASK_KEYS,
+                               required=folder in ("image", "cloth"))
+            for folder, fn in [
+                ("image", img_fn),
+                ("cloth", cloth_fn),
+                ("cloth-mask", cloth_fn),
+                ("agnostic-v3.2", img_fn),
+                ("image-densepose", img_fn),
+            ]
+        })
+        if self.pose_heatmaps:
+            sample['pose'] = self._heatmaps(self._load_pose(img_fn))
+        return sample
+
+class StableVITONTarDataset(SampleTensorMixin, IterableDataset):
+    def __init__(self, shard_dir, img_size=(512, 384), shuffle_shards=False, seed=0,
+                 rank=None, world_size=None, decode="full", uint8=False, pose_heatmaps=False, heatmap_size=None):
+        """Streaming companion to StableVITONDataset over shards from tar_shards.py.
         
-        # Load agnostic
-        agnostic_path = os.path.join(self.data_root, "agnostic-v3.2", img_fn)
-        try:
-            if os.path.exists(agnostic_path):
-                agnostic = Image.open(agnostic_path).convert('RGB')
-                agnostic_tensor = self.transform(agnostic)
-            else:
-                agnostic_tensor = torch.zeros_like(image_tensor)
-        except Exception as e:
-            print(f"Error loading agnostic {agnostic_path}: {e}")
-            agnostic_tensor = torch.zeros_like(image_tensor)
+        Each shard is read front to back, so storage only sees large sequential
+        reads. Shards are split across ranks first and then across DataLoader
+        workers, so every pair is produced exactly once per epoch.
         
-        # Load densepose
-        densepose_path = os.path.join(self.data_root, "image-densepose", img_fn)
-        try:
-            if os.path.exists(densepose_path):
-                densepose = Image.open(densepose_path).convert('RGB')
-                densepose_tensor = self.transform(densepose)
+        Args:
+            shard_dir: Directory written by tar_shards.py
+            img_size: Tuple of (height, width) for resizing images
+            shuffle_shards: Shuffle shard order each epoch (see set_epoch)
+            seed: Base seed for shard shuffling, shared by all ranks
+            rank, world_size: Process position in a distributed run; taken from
+                torch.distributed when it is initialised, else 0 and 1
+            decode: JPEG decode mode, as for StableVITONDataset
+            uint8: Return uint8 tensors, as for StableVITONDataset
+            pose_heatmaps, heatmap_size: Add joint heatmaps built from the
+                shard keypoints, as for StableVITONDataset
+        """
+        if decode not in DECODE_MODES:
+            raise ValueError(f"Unknown decode mode {decode!r}, expected one of {DECODE_MODES}")
+        if rank is None or world_size is None:
+            if torch.distributed.is_available() and torch.distributed.is_initialized():
+                rank, world_size = torch.distributed.get_rank(), torch.distributed.get_world_size()
             else:
-                densepose_tensor = torch.zeros_like(image_tensor)
-        except Exception as e:
-            print(f"Error loading densepose {densepose_path}: {e}")
-            densepose_tensor = torch.zeros_like(image_tensor)
-        
-        return {
-            'image': image_tensor,
-            'cloth': cloth_tensor,
-            'cloth_mask': cloth_mask_tensor,
-            'agnostic': agnostic_tensor,
-            'densepose': densepose_tensor,
-            'image_name': img_fn,
-            'cloth_name': cloth_fn
-        }
+                rank, world_size = 0, 1
+        self.shard_dir = shard_dir
+        self.shards = read_shard_index(shard_dir)
+        self.img_size = img_size
+        self.shuffle_shards = shuffle_shards
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.decode = decode
+        self.uint8 = uint8
+        self.pose_heatmaps = pose_heatmaps
+        self.heatmap_size = heatmap_size
+        self.epoch = 0
+        print(f"Found {len(self.shards)} shards with {sum(s['pairs'] for s in self.shards)} pairs in {shard_dir}")
+    
+    def set_epoch(self, epoch):
+        """Reshuffle shards for a new epoch (identically on every rank)."""
+        self.epoch = epoch
+    
+    def _rank_shards(self):
+        shards = list(self.shards)
+        if self.shuffle_shards:
+            random.Random(self.seed + self.epoch).shuffle(shards)
+        return shards[self.rank::self.world_size]
+    
+    def __len__(self):
+        return sum(shard["pairs"] for shard in self._rank_shards())
+    
+    def __iter__(self):
+        shards = self._rank_shards()
+        worker = get_worker_info()
+        if worker is not None:
+            shards = shards[worker.id::worker.num_workers]
+        for shard in shards:
+            for pair_index, fields in iter_shard(os.path.join(self.shard_dir, shard["file"])):
+                yield self._sample_from_fields(pair_index, fields)
+    
+    def _decode_bytes(self, data, is_mask=False):
+        height, width = self.img_size
+        img = open_image(io.BytesIO(data), 'L' if is_mask else 'RGB', self.img_size, self.decode)
+        img = img.resize((width, height), Image.BILINEAR)
+        return self._from_array(np.array(img).reshape(height, width, -1), is_mask)
+    
+    def _sample_from_fields(self, pair_index, fields):
+        fields = {split_field(field): data for field, data in fields.items()}
+        img_fn, cloth_fn = fields["pair"].decode("utf-8").split()
+        
+        tensors = {}
+        for folder, key in SAMPLE_KEYS.items():
+            if folder not in fields:
+                continue
+            try:
+                tensors[folder] = self._decode_bytes(fields[folder], is_mask=key in MASK_KEYS)
+            except Exception as e:
+                print(f"Error decoding {folder} for {img_fn}: {e}")
+        sample = self._make_sample(pair_index, img_fn, cloth_fn, tensors)
+        
+        # OpenPose body keypoints (x, y, confidence) of the first person, zeros if absent or unreadable
+        keypoints = torch.zeros((25, 3))
+        if "keypoints" in fields:
+            try:
+                keypoints = torch.from_numpy(parse_keypoints(fields["keypoints"])["pose"])
+            except ValueError as e:
+                print(f"Error decoding keypoints for {img_fn}: {e}")
+        sample['keypoints'] = keypoints
+        if self.pose_heatmaps:
+            sample['pose'] = self._heatmaps(keypoints.numpy())
+        return sample
+
+def normalize_batch(batch):
+    """Normalise a collated uint8 batch in place, one vectorised op per field.
+    
+    Produces the same ranges as the float path: [-1, 1] for RGB fields and
+    [0, 1] for masks.
+    """
+    for key in RGB_KEYS:
+        batch[key] = batch[key].float().div_(127.5).sub_(1)
+    for key in MASK_KEYS:
+        batch[key] = batch[key].float().div_(255)
+    if 'pose' in batch:
+        batch['pose'] = batch['pose'].float().div_(255)
+    return batch
 
 def show_tensor_image(tensor, title=None):
     """Display a tensor as an image."""
@@ -133,6 +424,140 @@ def show_tensor_image(tensor, title=None):
         plt.title(title)
     plt.axis('off')
 
+def tensor_to_array(tensor, is_mask=False):
+    """Convert a normalised CHW sample tensor back to an (H, W, C) uint8 array."""
+    if not is_mask:
+        tensor = tensor * 0.5 + 0.5  # Unnormalize
+    return (tensor.clamp(0, 1) * 255).round().byte().permute(1, 2, 0).cpu().numpy()
+
+def sample_panels(batch, j):
+    """The six visualisation panels of sample j of a normalised batch."""
+    return [
+        tensor_to_array(batch['image'][j]),
+        tensor_to_array(batch['cloth'][j]),
+        tensor_to_array(batch['cloth_mask'][j], is_mask=True),
+        tensor_to_array(batch['agnostic'][j]),
+        tensor_to_array(batch['densepose'][j]),
+        # This would be where the generated image goes in a full implementation
+        RESULT_PLACEHOLDER,
+    ]
+
+def render_sample(panels, title, output_path):
+    """Compose a sample's panels into a labelled grid and write it to disk.
+    
+    Returns the seconds spent, so pool workers can report their stage time.
+    """
+    start = time.perf_counter()
+    save_grid(panels, PANEL_LABELS, output_path, columns=3, title=title)
+    return time.perf_counter() - start
+
+class StageTimes:
+    """Accumulated time per pipeline stage, for the end-of-run throughput report."""
+    
+    def __init__(self):
+        self.seconds = {}
+    
+    def add(self, stage, seconds):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+    
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+    
+    def report(self, samples, wall_seconds, render_workers=0):
+        print("Stage throughput:")
+        for stage, seconds in self.seconds.items():
+            rate = samples / seconds if seconds > 0 else float('inf')
+            note = f" (summed over {render_workers} workers)" if stage == "render" and render_workers else ""
+            print(f"  {stage:>8}: {seconds:8.2f} s, {rate:8.1f} samples/s{note}")
+        print(f"  {'total':>8}: {wall_seconds:8.2f} s, {samples / max(wall_seconds, 1e-9):8.1f} samples/s wall clock")
+
+def render_sample_matplotlib(batch, j, title, output_path):
+    """Render sample j of a batch with matplotlib (slower; opt-in backend)."""
+    plt.figure(figsize=(15, 10))
+    
+    plt.subplot(2, 3, 1)
+    show_tensor_image(batch['image'][j:j+1], "Person Image")
+    
+    plt.subplot(2, 3, 2)
+    show_tensor_image(batch['cloth'][j:j+1], "Cloth Image")
+    
+    plt.subplot(2, 3, 3)
+    plt.imshow(batch['cloth_mask'][j, 0].cpu().numpy(), cmap='gray')
+    plt.title("Cloth Mask")
+    plt.axis('off')
+    
+    plt.subplot(2, 3, 4)
+    show_tensor_image(batch['agnostic'][j:j+1], "Agnostic")
+    
+    plt.subplot(2, 3, 5)
+    show_tensor_image(batch['densepose'][j:j+1], "DensePose")
+    
+    # This would be where the generated image goes in a full implementation
+    plt.subplot(2, 3, 6)
+    plt.text(0.5, 0.5, RESULT_PLACEHOLDER, 
+             horizontalalignment='center', verticalalignment='center',
+             fontsize=12, transform=plt.gca().transAxes)
+    plt.axis('off')
+    
+    plt.suptitle(title)
+    plt.tight_layout()
+    
+    plt.savefig(output_path)
+    plt.close()
+
+def prefetch(iterable, lookahead):
+    """Iterate while a background thread reads up to `lookahead` items ahead.
+    
+    Lets the next batches decode while the current one is being rendered.
+    """
+    if lookahead <= 0:
+        yield from iterable
+        return
+    
+    items = queue.Queue(maxsize=lookahead)
+    stop = threading.Event()
+    done = object()
+    
+    def put(entry):
+        """Queue an entry unless the consumer has gone away; returns False if it has."""
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def producer():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((None, e))
+            return
+        put((done, None))
+    
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                break
+            yield item
+    finally:
+        # Let the producer drop its iterator (and shut down any loader workers)
+        stop.set()
+        thread.join()
+
 def parse_args():
     parser = argparse.ArgumentParser(description='StableVITON Demo')
     parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
@@ -140,14 +565,36 @@ def parse_args():
     parser.add_argument('--output_dir', type=str, default='results', help='Directory to save results')
     parser.add_argument('--num_samples', type=int, default=5, help='Number of samples to visualize')
     parser.add_argument('--is_test', action='store_true', help='Whether to use test dataset')
-    parser.add_argument('--skip_missing', action='store_true', help='Skip samples with missing files')
+    parser.add_argument('--skip_missing', action='store_true', help='Drop pairs with missing files when building the index')
+    parser.add_argument('--packed_dir', type=str, default=None, help='Read samples from shards written by sample_store.py')
+    parser.add_argument('--renderer', type=str, default='pil', choices=['pil', 'matplotlib'], help='Backend used to draw sample grids')
+    parser.add_argument('--render_workers', type=int, default=0, help='Pool workers composing and writing PIL grids (0 renders inline)')
+    parser.add_argument('--mask_store', type=str, default=None, help='Cloth mask file written by mask_store.py, read instead of cloth-mask/*.jpg')
+    parser.add_argument('--contact_sheet', action='store_true', help='Write paged contact sheets and an HTML index instead of one PNG per sample')
+    parser.add_argument('--results_dir', type=str, default=None, help='Try-on results (<image>_<cloth>.jpg/png) shown as the last contact sheet column')
+    parser.add_argument('--render_pool', type=str, default='process', choices=['process', 'thread'], help='Kind of pool used with --render_workers')
+    parser.add_argument('--pose_heatmaps', action='store_true', help='Add Gaussian joint heatmaps built from openpose_json to each sample')
+    parser.add_argument('--heatmap_size', type=int, nargs=2, default=None, help='Heatmap height and width (default: the latent size, image size // 8; full-size float32 heatmaps take ~19 MiB and ~4 ms per sample at 512x384)')
+    parser.add_argument('--keypoint_index', type=str, default=None, help='Read poses from a keypoint_index.py directory instead of JSON')
+    parser.add_argument('--shard_dir', type=str, default=None, help='Stream samples from tar shards written by tar_shards.py')
+    parser.add_argument('--decode', type=str, default='full', choices=DECODE_MODES, help='JPEG decode mode (draft decodes at reduced size)')
+    parser.add_argument('--uint8', action='store_true', help='Load uint8 samples and normalise once per batch')
+    parser.add_argument('--cache_mb', type=int, default=0, help='Size of the decoded-sample LRU cache in MiB (0 disables it)')
+    parser.add_argument('--shared_cache', action='store_true', help='Share the decoded-sample cache between DataLoader workers')
+    parser.add_argument('--batch_size', type=int, default=1, help='DataLoader batch size')
+    parser.add_argument('--num_workers', type=int, default=0, help='DataLoader worker processes')
+    parser.add_argument('--persistent_workers', action='store_true', help='Keep DataLoader workers alive between passes')
+    parser.add_argument('--prefetch_factor', type=int, default=2, help='Batches each worker loads ahead (needs --num_workers > 0)')
+    parser.add_argument('--pin_memory', action='store_true', help='Return batches in pinned memory')
+    parser.add_argument('--lookahead', type=int, default=2, help='Batches read ahead of rendering by a background thread (0 disables)')
+    add_shard_args(parser)
     return parser.parse_args()
 
 def main():
     args = parse_args()
     
     # Check if data directory exists
-    if not os.path.exists(args.data_root):
+    if args.shard_dir is None and not os.path.exists(args.data_root):
         print(f"Error: Data directory {args.data_root} not found!")
         print("Please make sure the data directory exists and contains the required folders.")
         return
@@ -156,96 +603,177 @@ def main():
     os.makedirs(args.output_dir, exist_ok=True)
     
     # Create dataset and dataloader
-    dataset = StableVITONDataset(
-        data_root_dir=args.data_root,
-        pairs_file=args.pairs_file,
-        is_test=args.is_test
-    )
+    if args.shard_dir is not None:
+        dataset = StableVITONTarDataset(
+            shard_dir=args.shard_dir,
+            rank=args.rank,
+            world_size=args.world_size,
+            decode=args.decode,
+            uint8=args.uint8,
+            pose_heatmaps=args.pose_heatmaps,
+            heatmap_size=tuple(args.heatmap_size) if args.heatmap_size else None
+        )
+    else:
+        dataset = StableVITONDataset(
+            data_root_dir=args.data_root,
+            pairs_file=args.pairs_file,
+            is_test=args.is_test,
+            packed_dir=args.packed_dir,
+            skip_missing=args.skip_missing,
+            decode=args.decode,
+            uint8=args.uint8,
+            cache_bytes=args.cache_mb * 2**20,
+            shared_cache=args.shared_cache,
+            mask_store=args.mask_store,
+            pose_heatmaps=args.pose_heatmaps,
+            heatmap_size=tuple(args.heatmap_size) if args.heatmap_size else None,
+            keypoint_index=args.keypoint_index
+        )
+        dataset.print_completeness()
     
     if len(dataset) == 0:
         print("Error: No valid samples found in the dataset.")
         return
         
-    dataloader = DataLoader(dataset, batch_size=1, shuffle=False)
+    num_samples = min(args.num_samples, len(dataset))
+    
+    # Only hand the loader the samples this process will render; with
+    # --world_size > 1 the first num_samples pairs are split between ranks.
+    # A streamed dataset is sharded by the dataset itself and simply cut off.
+    if args.shard_dir is not None:
+        source = dataset
+    else:
+        candidates = [dataset.pairs[i] for i in range(num_samples)]
+        indices = shard_pairs(candidates, args.rank, args.world_size,
+                              args.data_root, MODALITIES, args.balance)
+        source = Subset(dataset, indices.tolist())
+        num_samples = len(indices)
+    
+    if args.contact_sheet:
+        if args.shard_dir is not None:
+            print("Error: --contact_sheet reads the source files and needs --data_root rather than --shard_dir")
+            return
+        # Tile thumbnails of the source files rather than rendering one PNG per pair
+        folders = ("image", "cloth") if args.results_dir else ("image", "cloth", "agnostic-v3.2")
+        labels = list(folders) + (["result"] if args.results_dir else [])
+        entries = pair_entries(args.data_root, dataset.pairs, args.results_dir, folders, indices.tolist())
+        sharded = args.world_size > 1
+        # The thumbnail cache has a single writer, so each rank keeps its own
+        write_contact_sheets(entries, labels, args.output_dir,
+                             cache_dir=os.path.join(args.output_dir, f".thumbs_r{args.rank}") if sharded else None,
+                             prefix=f"sheet_r{args.rank}" if sharded else "sheet",
+                             index_name=f"index_r{args.rank}.html" if sharded else "index.html",
+                             title=f"{args.data_root} pairs")
+        return
+    
+    loader_kwargs = {}
+    if args.num_workers > 0:
+        loader_kwargs = {
+            'persistent_workers': args.persistent_workers,
+            'prefetch_factor': args.prefetch_factor
+        }
+    dataloader = DataLoader(
+        source,
+        batch_size=args.batch_size,
+        shuffle=False,
+        num_workers=args.num_workers,
+        pin_memory=args.pin_memory,
+        **loader_kwargs
+    )
     
     print(f"Dataset size: {len(dataset)}")
-    print(f"Visualizing {min(args.num_samples, len(dataset))} samples...")
+    if args.world_size > 1:
+        print(f"Rank {args.rank} of {args.world_size}")
+    print(f"Visualizing {num_samples} samples...")
     
     # Visualize samples
     samples_processed = 0
     errors = 0
+    i = 0
+    times = StageTimes()
+    run_start = time.perf_counter()
     
-    progress_bar = tqdm.tqdm(dataloader, total=min(args.num_samples, len(dataset)))
-    for i, batch in enumerate(progress_bar):
-        if samples_processed >= args.num_samples:
-            break
-            
-        progress_bar.set_description(f"Processing sample {i+1}")
-        
+    # PIL renders can be handed to a pool. At most 2 * render_workers samples
+    # are in flight and results are collected in submission order, so output
+    # files and progress are deterministic.
+    renderer = None
+    if args.renderer == 'pil' and args.render_workers > 0:
+        pool = ProcessPoolExecutor if args.render_pool == 'process' else ThreadPoolExecutor
+        renderer = pool(max_workers=args.render_workers)
+    pending = deque()
+    
+    def collect_oldest():
+        nonlocal samples_processed, errors
+        future, output_filename = pending.popleft()
         try:
-            image = batch['image']
-            cloth = batch['cloth']
-            cloth_mask = batch['cloth_mask']
-            agnostic = batch['agnostic']
-            densepose = batch['densepose']
-            image_name = batch['image_name'][0]
-            cloth_name = batch['cloth_name'][0]
-            
-            # Check if any tensors are all zeros (missing files)
-            if args.skip_missing and (
-                torch.all(image == 0) or 
-                torch.all(cloth == 0) or 
-                torch.all(agnostic == 0) or 
-                torch.all(densepose == 0)
-            ):
-                print(f"Skipping sample {i+1} due to missing files")
-                continue
-            
-            # Create a visualization
-            plt.figure(figsize=(15, 10))
-            
-            plt.subplot(2, 3, 1)
-            show_tensor_image(image, "Person Image")
-            
-            plt.subplot(2, 3, 2)
-            show_tensor_image(cloth, "Cloth Image")
-            
-            plt.subplot(2, 3, 3)
-            plt.imshow(cloth_mask[0, 0].cpu().numpy(), cmap='gray')
-            plt.title("Cloth Mask")
-            plt.axis('off')
-            
-            plt.subplot(2, 3, 4)
-            show_tensor_image(agnostic, "Agnostic")
-            
-            plt.subplot(2, 3, 5)
-            show_tensor_image(densepose, "DensePose")
-            
-            # This would be where the generated image goes in a full implementation
-            plt.subplot(2, 3, 6)
-            plt.text(0.5, 0.5, "Virtual Try-On\n(Simulated Result)", 
-                     horizontalalignment='center', verticalalignment='center',
-                     fontsize=12, transform=plt.gca().transAxes)
-            plt.axis('off')
-            
-            plt.suptitle(f"Sample {samples_processed+1}: {image_name} with {cloth_name}")
-            plt.tight_layout()
-            
-            # Save the visualization
-            output_filename = f"sample_{samples_processed+1}_{image_name}_{cloth_name}.png"
-            output_path = os.path.join(args.output_dir, output_filename)
-            plt.savefig(output_path)
-            plt.close()
-            
+            times.add("render", future.result())
             samples_processed += 1
             progress_bar.set_postfix({"saved": output_filename})
-            
         except Exception as e:
-            print(f"Error processing sample {i+1}: {e}")
+            print(f"Error saving {output_filename}: {e}")
             errors += 1
-            plt.close()
+    
+    progress_bar = tqdm.tqdm(total=num_samples)
+    batches = prefetch(dataloader, args.lookahead)
+    while i < num_samples:
+        with times.measure("load"):
+            batch = next(batches, None)
+        if batch is None:
+            break
+        with times.measure("prepare"):
+            if args.uint8:
+                batch = normalize_batch(batch)
+        for j in range(len(batch['image_name'])):
+            if i >= num_samples:
+                break
+            i += 1
+            progress_bar.set_description(f"Processing sample {i}")
+            
+            try:
+                image_name = batch['image_name'][j]
+                cloth_name = batch['cloth_name'][j]
+                # Number outputs by pair so ranks can merge their results without clashes
+                sample_number = int(batch['pair_index'][j]) + 1
+                title = f"Sample {sample_number}: {image_name} with {cloth_name}"
+                output_filename = f"sample_{sample_number}_{image_name}_{cloth_name}.png"
+                output_path = os.path.join(args.output_dir, output_filename)
+                
+                if args.renderer == 'matplotlib':
+                    with times.measure("render"):
+                        render_sample_matplotlib(batch, j, title, output_path)
+                    samples_processed += 1
+                    progress_bar.set_postfix({"saved": output_filename})
+                else:
+                    with times.measure("prepare"):
+                        panels = sample_panels(batch, j)
+                    if renderer is None:
+                        times.add("render", render_sample(panels, title, output_path))
+                        samples_processed += 1
+                        progress_bar.set_postfix({"saved": output_filename})
+                    else:
+                        pending.append((renderer.submit(render_sample, panels, title, output_path), output_filename))
+                        if len(pending) >= 2 * args.render_workers:
+                            with times.measure("wait"):
+                                collect_oldest()
+                
+            except Exception as e:
+                print(f"Error processing sample {i}: {e}")
+                errors += 1
+                plt.close()
+            progress_bar.update(1)
+    batches.close()
+    if renderer is not None:
+        with times.measure("wait"):
+            while pending:
+                collect_oldest()
+        renderer.shutdown()
+    progress_bar.close()
     
     print(f"\nProcessing complete: {samples_processed} samples saved to {args.output_dir}")
+    if args.shard_dir is None and dataset.cache is not None and (args.shared_cache or args.num_workers == 0):
+        print(f"Decoded cache: {dataset.cache.stats()}")
+    times.report(samples_processed, time.perf_counter() - run_start,
+                 args.render_workers if renderer is not None else 0)
     if errors > 0:
         print(f"Encountered {errors} errors during processing")
 
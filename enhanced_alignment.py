@@ -1,9 +1,14 @@
 import os
 import numpy as np
 from PIL import Image, ImageFilter, ImageEnhance
-import matplotlib.pyplot as plt
 import datetime
 
+from grid_compositor import text_tile
+
+# "+" / "=" glyphs: 32pt on a 1-inch, 100 dpi tile, as the matplotlib version drew them
+GLYPH_SIZE = 44
+GLYPH_TILE = 100
+
 def ensure_dir(path):
     """Create directory if it doesn't exist"""
     os.makedirs(path, exist_ok=True)
@@ -100,35 +105,21 @@ def create_final_image(person_img_path, cloth_img_path, result_img_path, output_
         y_offset = margin
         final_img.paste(person_img, (x_offset, y_offset))
         
-        # Add "+" text
-        plt.figure(figsize=(1, 1), dpi=100)
-        plt.text(0.5, 0.5, "+", fontsize=32, ha='center', va='center')
-        plt.axis('off')
-        plt.tight_layout(pad=0)
-        plt.savefig("temp_plus.png", transparent=True)
-        plt.close()
-        
-        plus_img = Image.open("temp_plus.png")
-        plus_x = x_offset + person_img.width + margin//2
+        # Add "+" text (glyph tiles are rasterised once per process)
+        plus_img = text_tile("+", GLYPH_SIZE, GLYPH_TILE, GLYPH_TILE)
+        plus_x = x_offset + person_img.width + margin//2 - plus_img.width//2
         plus_y = y_offset + person_img.height//2 - plus_img.height//2
-        final_img.paste(plus_img, (plus_x, plus_y), plus_img.convert('RGBA'))
+        final_img.paste(plus_img, (plus_x, plus_y), plus_img)
         
         # Paste cloth image
         x_offset = x_offset + person_img.width + margin
         final_img.paste(cloth_img, (x_offset, y_offset))
         
         # Add "=" text
-        plt.figure(figsize=(1, 1), dpi=100)
-        plt.text(0.5, 0.5, "=", fontsize=32, ha='center', va='center')
-        plt.axis('off')
-        plt.tight_layout(pad=0)
-        plt.savefig("temp_equals.png", transparent=True)
-        plt.close()
-        
-        equals_img = Image.open("temp_equals.png")
+        equals_img = text_tile("=", GLYPH_SIZE, GLYPH_TILE, GLYPH_TILE)
         equals_x = total_width//2 - equals_img.width//2
-        equals_y = y_offset + max(person_img.height, cloth_img.height) + margin//2
-        final_img.paste(equals_img, (equals_x, equals_y), equals_img.convert('RGBA'))
+        equals_y = y_offset + max(person_img.height, cloth_img.height) + margin//2 - equals_img.height//2
+        final_img.paste(equals_img, (equals_x, equals_y), equals_img)
         
         # Paste result image centered
         x_offset = (total_width - result_img.width) // 2
@@ -138,13 +129,6 @@ def create_final_image(person_img_path, cloth_img_path, result_img_path, output_
         # Save final image
         final_img.save(output_path)
         
-        # Clean up temp files
-        try:
-            os.remove("temp_plus.png")
-            os.remove("temp_equals.png")
-        except:
-            pass
-            
         print(f"Final presentation image saved to {output_path}")
         return final_img
     except Exception as e:
@@ -3,12 +3,13 @@ import sys
 import subprocess
 import argparse
 from PIL import Image
-import numpy as np
-import matplotlib.pyplot as plt
 import datetime
 import time
 import shutil
 
+from grid_compositor import fit_panel, save_grid
+from cloth_masks import mask_image
+
 def ensure_dir(path):
     """Create directory if it doesn't exist"""
     os.makedirs(path, exist_ok=True)
@@ -16,20 +17,9 @@ def ensure_dir(path):
 def create_mask_from_image(image_path, output_path):
     """Create a simple mask for the clothing item"""
     try:
-        # Open the image
+        # White where the clothing is (alpha > 100, i.e. not very transparent)
         img = Image.open(image_path).convert('RGBA')
-        width, height = img.size
-        
-        # Create a white mask where the clothing is (non-transparent areas)
-        mask = Image.new('L', (width, height), 0)
-        for y in range(height):
-            for x in range(width):
-                r, g, b, a = img.getpixel((x, y))
-                if a > 100:  # If not very transparent
-                    mask.putpixel((x, y), 255)
-        
-        # Save the mask
-        mask.save(output_path)
+        mask_image(img, "alpha").save(output_path)
         print(f"Created mask at {output_path}")
         return True
     except Exception as e:
@@ -226,52 +216,25 @@ def create_final_visualization(person_img_path, cloth_img_path, basic_result_pat
     cloth_img = Image.open(cloth_img_path).convert('RGB')
     basic_result = Image.open(basic_result_path).convert('RGB')
     
-    # Create figure
-    plt.figure(figsize=(15, 10))
-    
-    # Original person image
-    plt.subplot(2, 2, 1)
-    plt.imshow(np.array(person_img))
-    plt.title("Person Image")
-    plt.axis('off')
-    
-    # Original clothing image
-    plt.subplot(2, 2, 2)
-    plt.imshow(np.array(cloth_img))
-    plt.title("Clothing Item")
-    plt.axis('off')
-    
-    # Basic alignment result
-    plt.subplot(2, 2, 3)
-    plt.imshow(np.array(basic_result))
-    plt.title("Basic Image Alignment")
-    plt.axis('off')
+    # Letterbox every panel to the person image's size
+    size = (person_img.height, person_img.width)
+    panels = [fit_panel(person_img, size), fit_panel(cloth_img, size), fit_panel(basic_result, size)]
+    labels = ["Person Image", "Clothing Item", "Basic Image Alignment", "StableVITON Result"]
     
     # StableVITON result (if available)
-    plt.subplot(2, 2, 4)
     if stableviton_result_path and os.path.exists(stableviton_result_path):
         try:
             stableviton_result = Image.open(stableviton_result_path).convert('RGB')
-            plt.imshow(np.array(stableviton_result))
-            plt.title("StableVITON Result")
+            panels.append(fit_panel(stableviton_result, size))
         except Exception as e:
             print(f"Error loading StableVITON result: {e}")
-            plt.text(0.5, 0.5, "StableVITON Result\n(Failed to load)", 
-                    horizontalalignment='center', verticalalignment='center',
-                    fontsize=12, transform=plt.gca().transAxes)
+            panels.append("StableVITON Result\n(Failed to load)")
     else:
-        plt.text(0.5, 0.5, "StableVITON Result\n(Not available)", 
-                horizontalalignment='center', verticalalignment='center',
-                fontsize=12, transform=plt.gca().transAxes)
-    plt.axis('off')
-    
-    # Add overall title
-    plt.suptitle("Virtual Try-On Comparison", fontsize=16)
-    plt.tight_layout()
+        panels.append("StableVITON Result\n(Not available)")
     
     # Save the visualization
-    plt.savefig(output_path)
-    plt.close()
+    save_grid(panels, labels, output_path, columns=2, title="Virtual Try-On Comparison",
+              padding=20, label_size=24, title_size=32)
     
     print(f"Final comparison visualization saved to {output_path}")
     return output_path
@@ -0,0 +1,110 @@
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# TrueType fonts to try before falling back to PIL's built-in bitmap font
+FONT_FILES = ("DejaVuSans.ttf", "arial.ttf")
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    """Load a label font once per size"""
+    for font_file in FONT_FILES:
+        try:
+            return ImageFont.truetype(font_file, size)
+        except OSError:
+            pass
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+def draw_centered_text(draw, box, text, font, fill=(0, 0, 0)):
+    """Draw (possibly multi-line) text centred in box = (left, top, right, bottom)"""
+    left, top, right, bottom = draw.multiline_textbbox((0, 0), text, font=font, align="center")
+    x = box[0] + (box[2] - box[0] - (right - left)) // 2 - left
+    y = box[1] + (box[3] - box[1] - (bottom - top)) // 2 - top
+    draw.multiline_text((x, y), text, font=font, fill=fill, align="center")
+
+@lru_cache(maxsize=256)
+def text_tile(text, size, width, height, fill=(0, 0, 0)):
+    """Rasterise text centred on a transparent (width, height) RGBA tile, once per process"""
+    tile = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw_centered_text(ImageDraw.Draw(tile), (0, 0, width, height), text, get_font(size), fill + (255,))
+    return tile
+
+def paste_text(canvas, box, text, size, fill=(0, 0, 0)):
+    """Paste the cached tile for text centred in box = (left, top, right, bottom)"""
+    tile = text_tile(text, size, box[2] - box[0], box[3] - box[1], fill)
+    canvas.paste(tile, box[:2], tile)
+
+def fit_panel(img, size, background=(255, 255, 255)):
+    """Letterbox a PIL image into a (height, width) uint8 tile, keeping its aspect ratio"""
+    height, width = size
+    scale = min(width / img.width, height / img.height)
+    resized = img.convert("RGB").resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                                        Image.BILINEAR)
+    tile = Image.new("RGB", (width, height), background)
+    tile.paste(resized, ((width - resized.width) // 2, (height - resized.height) // 2))
+    return np.asarray(tile)
+
+def to_rgb_array(panel):
+    """Promote an (H, W) or (H, W, 1) uint8 panel to (H, W, 3)"""
+    if panel.ndim == 2:
+        panel = panel[:, :, None]
+    if panel.shape[2] == 1:
+        panel = np.repeat(panel, 3, axis=2)
+    return panel
+
+def grid_layout(panel_size, count, columns=3, title=None, padding=10, label_size=16, title_size=20):
+    """Canvas size and per-panel label origins for a compose_grid layout.
+
+    Returns ((width, height), [(x, y), ...]) where (x, y) is the top-left of
+    each panel's label; the panel itself starts label_size + padding below.
+    """
+    height, width = panel_size
+    rows = (count + columns - 1) // columns
+    label_height = label_size + padding
+    title_height = title_size + 2 * padding if title else 0
+    cell_height = label_height + height + padding
+    canvas_size = (columns * (width + padding) + padding, title_height + rows * cell_height + padding)
+    origins = []
+    for i in range(count):
+        row, column = divmod(i, columns)
+        origins.append((padding + column * (width + padding), title_height + padding + row * cell_height))
+    return canvas_size, origins
+
+def compose_grid(panels, labels, columns=3, title=None, padding=10, label_size=16, title_size=20,
+                 background=(255, 255, 255), panel_size=None):
+    """Tile uint8 image panels into a labelled grid.
+
+    Args:
+        panels: (H, W, C) uint8 arrays, all the same size; a str panel is drawn
+            as centred text on a blank tile instead
+        labels: One caption per panel, drawn above it
+        columns: Tiles per row
+        title: Optional heading across the top
+        panel_size: (H, W) of a tile, needed only if every panel is a str
+    Returns:
+        The composed PIL image
+    """
+    height, width = panel_size or next(p.shape[:2] for p in panels if not isinstance(p, str))
+    label_height = label_size + padding
+    canvas_size, origins = grid_layout((height, width), len(panels), columns, title, padding, label_size, title_size)
+
+    canvas = Image.new("RGB", canvas_size, background)
+    if title:
+        paste_text(canvas, (0, 0, canvas.width, title_size + 2 * padding), title, title_size)
+
+    for (x, y), panel, label in zip(origins, panels, labels):
+        paste_text(canvas, (x, y, x + width, y + label_height - padding // 2), label, label_size)
+        y += label_height
+        if isinstance(panel, str):
+            paste_text(canvas, (x, y, x + width, y + height), panel, label_size)
+        else:
+            canvas.paste(Image.fromarray(to_rgb_array(panel)), (x, y))
+    return canvas
+
+def save_grid(panels, labels, output_path, compress_level=1, **kwargs):
+    """Compose a grid and write it straight to disk as PNG (fast, lightly compressed)"""
+    compose_grid(panels, labels, **kwargs).save(output_path, compress_level=compress_level)
+    return output_path
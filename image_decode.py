@@ -0,0 +1,18 @@
+from PIL import Image
+
+DECODE_MODES = ("full", "draft")
+
+def open_image(path, mode, size=None, decode="full"):
+    """Open an image and convert it to `mode`, optionally decoding at reduced size.
+
+    With decode="draft" and a target `size` of (height, width), JPEGs are
+    decoded with DCT scaling (1/2, 1/4 or 1/8) to the smallest scale that is
+    still at least `size`, so a 1024x768 VITON-HD image headed for 256x192
+    never gets decoded at full resolution. The caller still does the final
+    resize. Other formats ignore the draft request and decode normally.
+    """
+    img = Image.open(path)
+    if decode == "draft" and size is not None:
+        height, width = size
+        img.draft(mode, (width, height))
+    return img.convert(mode)
@@ -4,15 +4,65 @@ import argparse
 import datetime
 from PIL import Image, ImageOps, ImageFilter
 import numpy as np
-import matplotlib.pyplot as plt
 import cv2
 
+from grid_compositor import fit_panel, save_grid
+from cloth_masks import file_hash, white_background_mask
+
+# Foreground masks from the fast path, keyed by garment file hash
+FOREGROUND_CACHE = os.path.join("results", ".foreground_cache")
+
 def ensure_dir(path):
     """Create directory if it doesn't exist"""
     os.makedirs(path, exist_ok=True)
 
-def extract_foreground(image_path):
-    """Extract the foreground from the clothing image using OpenCV"""
+def coarse_foreground(rgb, max_side=256):
+    """Estimate a garment mask on a downscaled copy and refine only its boundary at full resolution.
+    
+    The small copy is thresholded against a white background, reduced to its
+    largest outer contour (filled) and cleaned with 3x3 morphology. The mask is
+    scaled back up with nearest neighbour, and only pixels in a band around
+    its edge are re-tested at full resolution.
+    """
+    height, width = rgb.shape[:2]
+    scale = min(1.0, max_side / max(height, width))
+    small = cv2.resize(rgb, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    
+    mask = white_background_mask(small).astype(np.uint8) * 255
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if contours:
+        mask = np.zeros_like(mask)
+        cv2.drawContours(mask, [max(contours, key=cv2.contourArea)], 0, 255, -1)
+    kernel = np.ones((3, 3), np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    band = cv2.dilate(mask, kernel) != cv2.erode(mask, kernel)
+    
+    full = cv2.resize(mask, (width, height), interpolation=cv2.INTER_NEAREST) > 0
+    band = cv2.resize(band.astype(np.uint8), (width, height), interpolation=cv2.INTER_NEAREST) > 0
+    rows, cols = np.nonzero(band)
+    full[rows, cols] = white_background_mask(rgb[rows, cols])
+    return full
+
+def cached_foreground(image_path, rgb, cache_dir=FOREGROUND_CACHE, max_side=256):
+    """coarse_foreground, cached on disk as a 1-bit PNG named by the garment's content hash"""
+    cache_path = os.path.join(cache_dir, f"{file_hash(image_path)}_{max_side}.png")
+    if os.path.exists(cache_path):
+        mask = np.array(Image.open(cache_path).convert('1'))
+        if mask.shape == rgb.shape[:2]:
+            return mask
+    mask = coarse_foreground(rgb, max_side)
+    ensure_dir(cache_dir)
+    Image.fromarray(mask).save(cache_path)
+    return mask
+
+def extract_foreground(image_path, fast=False, cache_dir=FOREGROUND_CACHE):
+    """Extract the foreground from the clothing image using OpenCV
+    
+    With fast=True, opaque garments are segmented against a white background
+    on a downscaled copy with only the edge refined at full resolution (see
+    coarse_foreground), and the mask is cached by file hash in cache_dir.
+    """
     # Load image
     img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
     
@@ -27,6 +77,8 @@ def extract_foreground(image_path):
     # Otherwise, use color-based segmentation
     # Convert to RGB for display
     rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    if fast:
+        return rgb_img, cached_foreground(image_path, rgb_img, cache_dir)
     
     # Convert to HSV for better color segmentation
     hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
@@ -81,14 +133,14 @@ def detect_person(image_path):
         'width': width
     }
 
-def enhanced_tryon(person_img_path, cloth_img_path, output_path):
+def enhanced_tryon(person_img_path, cloth_img_path, output_path, fast_foreground=False):
     """Perform enhanced clothing try-on with better blending"""
     try:
         # Load person image
         person_img = Image.open(person_img_path).convert('RGB')
         
         # Extract cloth and its mask
-        cloth_array, cloth_mask = extract_foreground(cloth_img_path)
+        cloth_array, cloth_mask = extract_foreground(cloth_img_path, fast=fast_foreground)
         
         # Convert numpy array to PIL image
         cloth_img = Image.fromarray(cloth_array)
@@ -151,38 +203,16 @@ def create_tryon_visualization(person_img_path, cloth_img_path, result_img_path)
     cloth_img = Image.open(cloth_img_path).convert('RGBA')
     result_img = Image.open(result_img_path).convert('RGB')
     
-    # Create figure with 1 row, 3 columns
-    fig, axes = plt.subplots(1, 3, figsize=(15, 6))
-    
-    # Original person image
-    axes[0].imshow(np.array(person_img))
-    axes[0].set_title("Original Person", fontsize=14)
-    axes[0].axis('off')
-    
-    # Original clothing image
-    # Create white background
+    # Original clothing image on a white background
     white_bg = Image.new('RGBA', cloth_img.size, (255, 255, 255, 255))
-    # Paste cloth image onto white background
     cloth_display = Image.alpha_composite(white_bg, cloth_img)
-    axes[1].imshow(np.array(cloth_display.convert('RGB')))
-    axes[1].set_title("Clothing Item", fontsize=14)
-    axes[1].axis('off')
-    
-    # Result image
-    axes[2].imshow(np.array(result_img))
-    axes[2].set_title("Virtual Try-On Result", fontsize=14)
-    axes[2].axis('off')
-    
-    # Add main title
-    plt.suptitle("Virtual Try-On Demo", fontsize=18, y=0.95)
-    
-    # Tight layout and adjust spacing
-    plt.tight_layout()
-    plt.subplots_adjust(wspace=0.05, top=0.85)
     
-    # Save the figure
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    plt.close()
+    # One row of panels letterboxed to the person image's size
+    size = (person_img.height, person_img.width)
+    panels = [fit_panel(person_img, size), fit_panel(cloth_display, size), fit_panel(result_img, size)]
+    labels = ["Original Person", "Clothing Item", "Virtual Try-On Result"]
+    save_grid(panels, labels, output_path, columns=3, title="Virtual Try-On Demo",
+              padding=20, label_size=28, title_size=36)
     
     print(f"Visualization saved to {output_path}")
     return output_path
@@ -192,6 +222,7 @@ def parse_args():
     parser.add_argument("--person", type=str, required=True, help="Path to person image")
     parser.add_argument("--cloth", type=str, required=True, help="Path to clothing image")
     parser.add_argument("--output", type=str, default="results/enhanced_tryon.png", help="Output path for try-on result")
+    parser.add_argument("--fast_foreground", action="store_true", help="Segment the garment on a downscaled copy, refine its edge and cache the mask")
     return parser.parse_args()
 
 def main():
@@ -210,7 +241,7 @@ def main():
     result_path = f"results/enhanced_tryon_{timestamp}.png"
     ensure_dir("results")
     
-    result_img = enhanced_tryon(args.person, args.cloth, result_path)
+    result_img = enhanced_tryon(args.person, args.cloth, result_path, fast_foreground=args.fast_foreground)
     if result_img:
         # Create visualization
         viz_path = create_tryon_visualization(args.person, args.cloth, result_path)
@@ -0,0 +1,125 @@
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import tqdm
+
+from openpose import PARTS, KEYPOINTS_SUFFIX, image_stem, read_keypoints
+from sample_store import ensure_dir
+
+INDEX_FILE = "keypoints.json"
+
+def parse_chunk(job):
+    """Pool worker: stack the requested parts of a list of keypoint files into (n, points, 3) arrays"""
+    paths, parts = job
+    arrays = {part: np.zeros((len(paths), PARTS[part][1], 3), dtype=np.float32) for part in parts}
+    for i, path in enumerate(paths):
+        for part, values in read_keypoints(path, parts).items():
+            arrays[part][i] = values
+    return arrays
+
+def build_keypoint_index(pose_dir, output_dir, parts=("pose",), workers=None, chunk_size=256):
+    """Parse every ``*_keypoints.json`` in pose_dir into one ``<part>.npy`` array per part.
+
+    Rows follow the sorted file names; ``keypoints.json`` lists the image stem
+    of each row (00006_00) and the parts stored. Files are parsed in chunks by
+    a process pool. People missing from a file leave an all-zero row.
+    """
+    parts = tuple(parts)
+    for part in parts:
+        if part not in PARTS:
+            raise ValueError(f"Unknown keypoint part {part!r}, expected one of {tuple(PARTS)}")
+    ensure_dir(output_dir)
+    names = sorted(f for f in os.listdir(pose_dir) if f.endswith(KEYPOINTS_SUFFIX))
+    print(f"Indexing {len(names)} keypoint files from {pose_dir}")
+
+    outputs = {part: np.lib.format.open_memmap(os.path.join(output_dir, f"{part}.npy"), mode="w+", dtype=np.float32,
+                                               shape=(len(names), PARTS[part][1], 3))
+               for part in parts}
+    jobs = [([os.path.join(pose_dir, f) for f in names[start:start + chunk_size]], parts)
+            for start in range(0, len(names), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start, arrays in zip(range(0, len(names), chunk_size),
+                                 tqdm.tqdm(pool.map(parse_chunk, jobs), total=len(jobs), desc="chunks")):
+            for part, array in arrays.items():
+                outputs[part][start:start + len(array)] = array
+    for array in outputs.values():
+        array.flush()
+
+    with open(os.path.join(output_dir, INDEX_FILE), "w") as f:
+        json.dump({"names": [image_stem(f) for f in names], "parts": list(parts)}, f)
+    print(f"Wrote {', '.join(f'{part}.npy' for part in parts)} to {output_dir}")
+    return output_dir
+
+class KeypointIndex:
+    """Read-only view over arrays written by ``build_keypoint_index``.
+
+    Lookups accept an image name (00006_00.jpg), its stem or the keypoints
+    file name, and return rows of memory-mapped arrays, so no JSON is touched
+    after construction. Arrays are mapped lazily, so the index can be handed
+    to DataLoader workers.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, INDEX_FILE), "r") as f:
+            index = json.load(f)
+        self.parts = tuple(index["parts"])
+        self.rows = {name: i for i, name in enumerate(index["names"])}
+        self._arrays = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_arrays"] = {}
+        return state
+
+    def __len__(self):
+        return len(self.rows)
+
+    def array(self, part="pose"):
+        """The whole (N, points, 3) array for a part"""
+        if part not in self._arrays:
+            if part not in self.parts:
+                raise KeyError(f"{part!r} was not indexed (have {self.parts})")
+            self._arrays[part] = np.load(os.path.join(self.index_dir, f"{part}.npy"), mmap_mode="r")
+        return self._arrays[part]
+
+    def row(self, name):
+        """Row of a person, or None if they are not in the index"""
+        if name.endswith(KEYPOINTS_SUFFIX):
+            name = image_stem(name)
+        row = self.rows.get(name)
+        if row is None:
+            row = self.rows.get(os.path.splitext(name)[0])
+        return row
+
+    def has(self, name):
+        return self.row(name) is not None
+
+    def get(self, name, part="pose"):
+        """(points, 3) keypoints of one person, or None if they are not in the index"""
+        row = self.row(name)
+        if row is None:
+            return None
+        return self.array(part)[row]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Index a folder of OpenPose JSON files into memory-mappable arrays')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--output_dir', type=str, default=None, help='Directory to write to (default: <data_root>/keypoint_index)')
+    parser.add_argument('--parts', type=str, nargs='+', default=['pose'], choices=list(PARTS), help='Keypoint parts to index')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    pose_dir = os.path.join(args.data_root, "openpose_json")
+    if not os.path.exists(pose_dir):
+        print(f"Error: Keypoint directory {pose_dir} not found!")
+        return
+    build_keypoint_index(pose_dir, args.output_dir or os.path.join(args.data_root, "keypoint_index"),
+                         args.parts, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import os
+import json
+import struct
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+import tqdm
+
+MAGIC = b"MASKSTR1"
+ALIGN = 64
+# Per-entry encodings
+BITS, RLE_FROM_0, RLE_FROM_1 = 0, 1, 2
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+def encode_mask(mask):
+    """Encode an (H, W) bool mask as (encoding, bytes), bit-packed or run-length, whichever is smaller"""
+    flat = mask.reshape(-1)
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    runs = np.diff(np.concatenate(([0], changes, [flat.size])))
+    bits = np.packbits(flat)
+    if runs.size * 4 < bits.size:
+        return (RLE_FROM_1 if flat[0] else RLE_FROM_0), runs.astype("<u4").tobytes()
+    return BITS, bits.tobytes()
+
+def decode_mask(encoding, payload, shape):
+    """Inverse of encode_mask; returns an (H, W) bool array"""
+    height, width = shape
+    if encoding == BITS:
+        return np.unpackbits(payload, count=height * width).view(bool).reshape(height, width)
+    runs = payload.view("<u4")
+    values = np.zeros(runs.size, dtype=bool)
+    values[(1 if encoding == RLE_FROM_0 else 0)::2] = True
+    return np.repeat(values, runs).reshape(height, width)
+
+def read_mask(path, size=None, threshold=128):
+    """Load a stored mask image as (H, W) bool, optionally resized (bilinear) to size = (H, W)"""
+    with Image.open(path) as img:
+        img = img.convert("L")
+        if size is not None:
+            img = img.resize((size[1], size[0]), Image.BILINEAR)
+        return np.asarray(img) >= threshold
+
+def encode_file(job):
+    """Pool worker: (path, size, threshold) -> (shape, encoding, bytes)"""
+    path, size, threshold = job
+    mask = read_mask(path, size, threshold)
+    return mask.shape, *encode_mask(mask)
+
+def pack_masks(mask_dir, output_path, size=None, threshold=128, workers=None):
+    """Pack every mask image in a folder into one indexed file.
+
+    The file is MAGIC, the header length, a JSON header (names, shapes,
+    encodings and payload offsets) padded to 64 bytes, then the encoded masks
+    back to back. Masks are thresholded at `threshold` (after an optional
+    bilinear resize to size = (H, W)) and each is stored bit-packed or
+    run-length encoded, whichever is smaller.
+    """
+    names = sorted(f for f in os.listdir(mask_dir) if f.lower().endswith(IMAGE_EXTS))
+    jobs = [(os.path.join(mask_dir, name), size, threshold) for name in names]
+    print(f"Packing {len(names)} masks from {mask_dir} into {output_path}")
+
+    shapes, encodings, offsets, payloads = [], [], [0], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shape, encoding, payload in tqdm.tqdm(pool.map(encode_file, jobs, chunksize=32), total=len(jobs)):
+            shapes.append(list(shape))
+            encodings.append(encoding)
+            payloads.append(payload)
+            offsets.append(offsets[-1] + len(payload))
+
+    header = json.dumps({"names": names, "shapes": shapes, "encodings": encodings,
+                         "offsets": offsets, "threshold": threshold}).encode("utf-8")
+    data_offset = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+    with open(output_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        f.write(b"\0" * (data_offset - f.tell()))
+        for payload in payloads:
+            f.write(payload)
+
+    raw = sum(h * w for h, w in shapes)
+    print(f"Wrote {len(names)} masks, {offsets[-1] / 2**20:.2f} MiB "
+          f"({offsets[-1] / max(raw, 1) * 100:.1f}% of one byte per pixel, "
+          f"{encodings.count(BITS)} bit-packed, {len(names) - encodings.count(BITS)} run-length)")
+    return output_path
+
+class MaskStore:
+    """Read-only view over a file written by ``pack_masks``.
+
+    The payload is memory-mapped lazily on first use, so a store can be handed
+    to DataLoader workers and each worker maps the file itself.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a mask store")
+            header_len, = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+        self.data_offset = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+        self.rows = {name: i for i, name in enumerate(header["names"])}
+        self.shapes = np.array(header["shapes"], dtype=np.int64).reshape(-1, 2)
+        self.encodings = np.array(header["encodings"], dtype=np.uint8)
+        self.offsets = np.array(header["offsets"], dtype=np.int64)
+        self._data = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    def __len__(self):
+        return len(self.rows)
+
+    def has(self, name):
+        return name in self.rows
+
+    def _payload(self, row):
+        if self._data is None:
+            if self.offsets[-1] == 0:
+                return np.zeros(0, dtype=np.uint8)
+            self._data = np.memmap(self.path, dtype=np.uint8, mode="r", offset=self.data_offset)
+        return self._data[self.offsets[row]:self.offsets[row + 1]]
+
+    def get(self, name, dtype=bool):
+        """Return the (H, W) mask for a file name (bool, or uint8 0/255), or None if absent"""
+        row = self.rows.get(name)
+        if row is None:
+            return None
+        mask = decode_mask(int(self.encodings[row]), self._payload(row), self.shapes[row])
+        if dtype == np.uint8:
+            return mask.view(np.uint8) * np.uint8(255)
+        return mask
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Pack a folder of mask images into one bit-packed/RLE file')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--folder', type=str, default='cloth-mask', help='Mask folder to pack (cloth-mask or agnostic-mask)')
+    parser.add_argument('--output', type=str, default=None, help='Output file (default: <data_root>/<folder>.masks)')
+    parser.add_argument('--img_size', type=int, nargs=2, default=None, help='Resize masks to this height and width before packing')
+    parser.add_argument('--threshold', type=int, default=128, help='Grey level at or above which a pixel is foreground')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    mask_dir = os.path.join(args.data_root, args.folder)
+    if not os.path.exists(mask_dir):
+        print(f"Error: Mask directory {mask_dir} not found!")
+        return
+    output = args.output or os.path.join(args.data_root, f"{args.folder}.masks")
+    pack_masks(mask_dir, output, tuple(args.img_size) if args.img_size else None, args.threshold, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import json
+import numpy as np
+
+# OpenPose BODY_25 joints
+(NOSE, NECK, R_SHOULDER, R_ELBOW, R_WRIST, L_SHOULDER, L_ELBOW, L_WRIST, MID_HIP, R_HIP, R_KNEE, R_ANKLE,
+ L_HIP, L_KNEE, L_ANKLE, R_EYE, L_EYE, R_EAR, L_EAR, L_BIG_TOE, L_SMALL_TOE, L_HEEL, R_BIG_TOE, R_SMALL_TOE,
+ R_HEEL) = range(25)
+NUM_POSE_JOINTS = 25
+# Keypoint part -> (JSON field, number of points)
+PARTS = {
+    "pose": ("pose_keypoints_2d", NUM_POSE_JOINTS),
+    "face": ("face_keypoints_2d", 70),
+    "hand_left": ("hand_left_keypoints_2d", 21),
+    "hand_right": ("hand_right_keypoints_2d", 21),
+}
+KEYPOINTS_SUFFIX = "_keypoints.json"
+# Size of the VITON-HD images the keypoints were detected on, as (H, W)
+KEYPOINT_IMAGE_SIZE = (1024, 768)
+
+def keypoints_name(img_fn):
+    """OpenPose file name for a person image (00006_00.jpg -> 00006_00_keypoints.json)"""
+    return os.path.splitext(img_fn)[0] + KEYPOINTS_SUFFIX
+
+def image_stem(keypoints_fn):
+    """Inverse of keypoints_name without the extension (00006_00_keypoints.json -> 00006_00)"""
+    return keypoints_fn[:-len(KEYPOINTS_SUFFIX)]
+
+def read_keypoints_json(path, parts=("pose",)):
+    """read_keypoints by parsing the whole file with json.load"""
+    with open(path, "r") as f:
+        return person_keypoints(json.load(f), parts)
+
+def person_keypoints(document, parts=("pose",)):
+    """read_keypoints for an already parsed OpenPose document"""
+    people = document.get("people", [])
+    person = people[0] if people else {}
+    arrays = {}
+    for part in parts:
+        field, count = PARTS[part]
+        array = np.zeros((count, 3), dtype=np.float32)
+        values = np.asarray(person.get(field) or [], dtype=np.float32).reshape(-1, 3)[:count]
+        array[:len(values)] = values
+        arrays[part] = array
+    return arrays
+
+def scan_keypoints(data, parts=("pose",)):
+    """Extract the requested flat keypoint arrays from the raw bytes of an OpenPose file.
+
+    Each part's first occurrence (the first person) is located by its key and
+    only the text between its brackets is parsed, straight into float32.
+    Returns None if the text does not look as expected (including a key whose
+    value is not an array, such as null), so callers can fall back to a full
+    parse.
+    """
+    arrays = {}
+    for part in parts:
+        field, count = PARTS[part]
+        array = np.zeros((count, 3), dtype=np.float32)
+        quoted = b'"' + field.encode("ascii") + b'"'
+        key = data.find(quoted)
+        if key >= 0:
+            # The value must be the array itself: only a colon and whitespace may sit in between
+            start = data.find(b"[", key)
+            end = data.find(b"]", start)
+            if start < 0 or end < 0 or data[key + len(quoted):start].strip(b" \t\r\n") != b":":
+                return None
+            text = data[start + 1:end].strip()
+            if text:
+                values = np.fromstring(text.decode("ascii"), dtype=np.float32, sep=",")
+                if values.size != text.count(b",") + 1 or values.size % 3:
+                    return None
+                values = values.reshape(-1, 3)[:count]
+                array[:len(values)] = values
+        arrays[part] = array
+    return arrays
+
+def read_keypoints(path, parts=("pose",)):
+    """{part: (points, 3) float32 array of (x, y, confidence)} for the first person in a file.
+
+    Parts missing from the file, or every part if nobody was found, are zeros.
+    Only the requested arrays are parsed (see scan_keypoints); anything
+    unexpected falls back to json.load.
+    """
+    with open(path, "rb") as f:
+        return parse_keypoints(f.read(), parts)
+
+def parse_keypoints(data, parts=("pose",)):
+    """read_keypoints for the raw bytes of an OpenPose file (e.g. read from a tar shard)
+
+    Raises ValueError (json.JSONDecodeError) if the data is not valid JSON.
+    """
+    try:
+        arrays = scan_keypoints(data, parts)
+    except (ValueError, UnicodeDecodeError):
+        arrays = None
+    if arrays is None:
+        return person_keypoints(json.loads(data), parts)
+    return arrays
+
+def read_pose(path):
+    """(25, 3) float32 array of (x, y, confidence) for the first person in a file; zeros if nobody was found"""
+    return read_keypoints(path)["pose"]
@@ -0,0 +1,68 @@
+import os
+import heapq
+import numpy as np
+
+BALANCE_MODES = ("size", "count")
+
+def env_rank_world():
+    """Rank and world size from torchrun-style RANK/WORLD_SIZE variables, else (0, 1)"""
+    return int(os.environ.get("RANK", 0)), int(os.environ.get("WORLD_SIZE", 1))
+
+def add_shard_args(parser):
+    """Add --rank, --world_size and --balance options to an argparse parser"""
+    rank, world_size = env_rank_world()
+    parser.add_argument('--rank', type=int, default=rank, help='Index of this process among --world_size (default: $RANK or 0)')
+    parser.add_argument('--world_size', type=int, default=world_size, help='Number of processes splitting the pairs (default: $WORLD_SIZE or 1)')
+    parser.add_argument('--balance', type=str, default='size', choices=BALANCE_MODES, help='Balance shards by total file size or by pair count')
+
+def folder_sizes(path):
+    """Map file name -> size in bytes for one folder, with a single scandir pass"""
+    sizes = {}
+    if not os.path.isdir(path):
+        return sizes
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file():
+                sizes[entry.name] = entry.stat().st_size
+    return sizes
+
+def pair_weights(data_root, pairs, modalities):
+    """Total on-disk size of each pair's files across `modalities` ({folder: (column, mode)})"""
+    weights = np.ones(len(pairs), dtype=np.int64)
+    for folder, (column, _) in modalities.items():
+        sizes = folder_sizes(os.path.join(data_root, folder))
+        weights += [sizes.get(im if column == "image" else c, 0) for im, c in pairs]
+    return weights
+
+def shard_indices(weights, rank, world_size):
+    """Indices (ascending) of the items assigned to `rank` out of `world_size`.
+
+    Items are handed out heaviest first to the currently lightest shard, which
+    keeps total weight per shard balanced. Ties are broken by item and shard
+    index, so every process computes the same assignment and the shards never
+    overlap.
+    """
+    if not 0 <= rank < world_size:
+        raise ValueError(f"rank must be in [0, {world_size}), got {rank}")
+    weights = np.asarray(weights, dtype=np.int64)
+    owner = np.empty(len(weights), dtype=np.int64)
+    loads = [(0, r) for r in range(world_size)]
+    for i in np.argsort(-weights, kind="stable"):
+        load, r = heapq.heappop(loads)
+        owner[i] = r
+        heapq.heappush(loads, (load + int(weights[i]), r))
+    return np.nonzero(owner == rank)[0]
+
+def shard_pairs(pairs, rank, world_size, data_root=None, modalities=None, balance="size"):
+    """Indices of `pairs` this rank should process.
+
+    With balance="size" (and a data root), shards are balanced by the bytes
+    each pair reads; otherwise by pair count.
+    """
+    if world_size == 1:
+        return np.arange(len(pairs))
+    if balance == "size" and data_root is not None and modalities:
+        weights = pair_weights(data_root, pairs, modalities)
+    else:
+        weights = np.ones(len(pairs), dtype=np.int64)
+    return shard_indices(weights, rank, world_size)
@@ -0,0 +1,67 @@
+import numpy as np
+
+COLUMNS = ("image", "cloth")
+
+def read_pairs(pairs_file):
+    """Read (image, cloth) name pairs from a pairs file"""
+    pairs = []
+    with open(pairs_file, "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2:
+                pairs.append((parts[0], parts[1]))
+    return pairs
+
+class PairTable:
+    """(image, cloth) pairs stored as integer ids into one interned name blob.
+
+    Every distinct file name is stored once in a UTF-8 byte blob addressed by
+    an offsets array, and each pair is a row of two int32 ids. The whole table
+    is three NumPy arrays, so forked DataLoader workers can read it without
+    touching per-string refcounts (and copying pages), and it pickles as a few
+    buffers when workers are spawned.
+    """
+
+    def __init__(self, pairs=()):
+        ids = {}
+        rows = []
+        for im_name, c_name in pairs:
+            rows.append((ids.setdefault(im_name, len(ids)), ids.setdefault(c_name, len(ids))))
+        encoded = [name.encode("utf-8") for name in ids]
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=self.offsets[1:])
+        self.blob = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+        self.pairs = np.array(rows, dtype=np.int32).reshape(-1, 2)
+
+    @classmethod
+    def from_file(cls, pairs_file):
+        return cls(read_pairs(pairs_file))
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __getitem__(self, idx):
+        im_id, c_id = self.pairs[idx]
+        return self.name(im_id), self.name(c_id)
+
+    @property
+    def num_names(self):
+        return len(self.offsets) - 1
+
+    def name(self, name_id):
+        return self.blob[self.offsets[name_id]:self.offsets[name_id + 1]].tobytes().decode("utf-8")
+
+    def column(self, column):
+        """Name ids of the "image" or "cloth" column"""
+        return self.pairs[:, COLUMNS.index(column)]
+
+    def select(self, keep):
+        """Return a table with only the rows selected by a boolean mask or index array.
+
+        The name blob is shared with this table rather than copied.
+        """
+        table = PairTable.__new__(PairTable)
+        table.offsets = self.offsets
+        table.blob = self.blob
+        table.pairs = self.pairs[np.asarray(keep)]
+        return table
@@ -0,0 +1,168 @@
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+import tqdm
+
+from openpose import (NECK, R_SHOULDER, R_ELBOW, R_WRIST, L_SHOULDER, L_ELBOW, L_WRIST, R_HIP, L_HIP,
+                      KEYPOINTS_SUFFIX, KEYPOINT_IMAGE_SIZE, image_stem, read_pose)
+from sample_store import ensure_dir
+from keypoint_index import KeypointIndex
+
+# Agnostic masks are named like the person image, where run_inference.py looks for them
+AGNOSTIC_MASK_DIR = "agnostic-mask"
+MIN_CONFIDENCE = 0.05
+# Limbs masked as capsules, and their radius as a fraction of the shoulder width
+LIMBS = ((R_SHOULDER, R_ELBOW), (R_ELBOW, R_WRIST), (L_SHOULDER, L_ELBOW), (L_ELBOW, L_WRIST),
+         (NECK, R_SHOULDER), (NECK, L_SHOULDER))
+LIMB_RADIUS = 0.18
+# Torso polygon (shoulders to hips), widened about its centre
+TORSO = (R_SHOULDER, L_SHOULDER, L_HIP, R_HIP)
+TORSO_SCALE = 1.15
+AGNOSTIC_FILL = (128, 128, 128)
+
+def fill_convex_polygon(mask, points):
+    """Set the pixels inside a convex polygon (N, 2) of (x, y) points, testing only its bounding box"""
+    height, width = mask.shape
+    x0, y0 = np.floor(points.min(axis=0)).astype(int).clip(0, [width, height])
+    x1, y1 = (np.ceil(points.max(axis=0)).astype(int) + 1).clip(0, [width, height])
+    if x0 >= x1 or y0 >= y1:
+        return mask
+    ys = np.arange(y0, y1, dtype=np.float32)[:, None]
+    xs = np.arange(x0, x1, dtype=np.float32)[None, :]
+    # Cross product of each edge with the pixel offset; inside means the same sign for every edge
+    positive = np.ones((y1 - y0, x1 - x0), dtype=bool)
+    negative = positive.copy()
+    for (ax, ay), (bx, by) in zip(points, np.roll(points, -1, axis=0)):
+        cross = (bx - ax) * (ys - ay) - (by - ay) * (xs - ax)
+        positive &= cross >= 0
+        negative &= cross <= 0
+    mask[y0:y1, x0:x1] |= positive | negative
+    return mask
+
+def fill_capsule(mask, a, b, radius):
+    """Set the pixels within `radius` of the segment a-b"""
+    height, width = mask.shape
+    x0, y0 = np.floor(np.minimum(a, b) - radius).astype(int).clip(0, [width, height])
+    x1, y1 = (np.ceil(np.maximum(a, b) + radius).astype(int) + 1).clip(0, [width, height])
+    if x0 >= x1 or y0 >= y1:
+        return mask
+    ys = np.arange(y0, y1, dtype=np.float32)[:, None] - a[1]
+    xs = np.arange(x0, x1, dtype=np.float32)[None, :] - a[0]
+    ab = b - a
+    t = (xs * ab[0] + ys * ab[1]) / max(float(ab @ ab), 1e-6)
+    np.clip(t, 0, 1, out=t)
+    dx, dy = xs - t * ab[0], ys - t * ab[1]
+    mask[y0:y1, x0:x1] |= dx * dx + dy * dy <= radius * radius
+    return mask
+
+def agnostic_mask(pose, size=KEYPOINT_IMAGE_SIZE, pose_size=KEYPOINT_IMAGE_SIZE, min_confidence=MIN_CONFIDENCE):
+    """(H, W) bool torso/arm mask for one (25, 3) pose.
+
+    Keypoints are scaled from pose_size to size, both (H, W). Limbs with a
+    missing joint are skipped; without both shoulders the mask is empty.
+    """
+    height, width = size
+    mask = np.zeros((height, width), dtype=bool)
+    points = pose[:, :2] * np.array([width / pose_size[1], height / pose_size[0]], dtype=np.float32)
+    seen = pose[:, 2] >= min_confidence
+    if not (seen[R_SHOULDER] and seen[L_SHOULDER]):
+        return mask
+
+    shoulder_width = float(np.linalg.norm(points[R_SHOULDER] - points[L_SHOULDER]))
+    if seen[list(TORSO)].all():
+        torso = points[list(TORSO)]
+        centre = torso.mean(axis=0)
+        fill_convex_polygon(mask, centre + (torso - centre) * TORSO_SCALE)
+    radius = LIMB_RADIUS * shoulder_width
+    for i, j in LIMBS:
+        if seen[i] and seen[j]:
+            fill_capsule(mask, points[i], points[j], radius)
+    return mask
+
+def agnostic_mask_path(data_root, img_fn, mask_dir=AGNOSTIC_MASK_DIR):
+    """Path of the agnostic mask for a person image (00006_00.jpg -> <data_root>/agnostic-mask/00006_00.jpg)"""
+    return os.path.join(data_root, mask_dir, img_fn)
+
+def image_size(path, default=KEYPOINT_IMAGE_SIZE):
+    """(H, W) of an image from its header, or default if it does not exist"""
+    try:
+        with Image.open(path) as img:
+            return img.height, img.width
+    except OSError:
+        return default
+
+def mask_job(job):
+    """Pool worker: write the agnostic mask (and optionally agnostic image) for one pose (array or keypoints file)"""
+    pose, image_path, mask_path, agnostic_path, size = job
+    if not isinstance(pose, np.ndarray):
+        pose = read_pose(pose)
+    mask = agnostic_mask(pose, size or image_size(image_path))
+    Image.fromarray(mask.view(np.uint8) * np.uint8(255)).save(mask_path, quality=95)
+    if agnostic_path and os.path.exists(image_path):
+        img = np.array(Image.open(image_path).convert('RGB'))
+        if img.shape[:2] == mask.shape:
+            img[mask] = AGNOSTIC_FILL
+            Image.fromarray(img).save(agnostic_path, quality=95)
+    return os.path.basename(mask_path)
+
+def generate_agnostic_masks(data_root, mask_dir=AGNOSTIC_MASK_DIR, agnostic_dir=None, size=None, workers=None,
+                            overwrite=False, keypoint_index=None):
+    """Build an agnostic mask for every file in <data_root>/openpose_json.
+
+    Masks are written as <data_root>/<mask_dir>/<image name> (see
+    agnostic_mask_path), the layout stableviton_dataset_prep.py uses, at the
+    person image's size, or at size = (H, W) if given (1024x768 when the image
+    is absent). With agnostic_dir, the person image is also written there with
+    the masked region filled grey, named like the image, which is where
+    StableVITONDataset reads agnostic-v3.2 inputs from. With keypoint_index
+    (a directory written by keypoint_index.py), poses are read from its
+    arrays instead of parsing JSON.
+    """
+    index = KeypointIndex(keypoint_index) if keypoint_index else None
+    pose_dir = os.path.join(data_root, "openpose_json")
+    ensure_dir(os.path.join(data_root, mask_dir))
+    if agnostic_dir:
+        ensure_dir(os.path.join(data_root, agnostic_dir))
+    jobs = []
+    for fn in sorted(os.listdir(pose_dir)):
+        if not fn.endswith(KEYPOINTS_SUFFIX):
+            continue
+        stem = image_stem(fn)
+        mask_path = agnostic_mask_path(data_root, stem + ".jpg", mask_dir)
+        if not overwrite and os.path.exists(mask_path):
+            continue
+        image_path = os.path.join(data_root, "image", stem + ".jpg")
+        agnostic_path = os.path.join(data_root, agnostic_dir, stem + ".jpg") if agnostic_dir else None
+        pose = np.array(index.get(stem)) if index is not None and index.has(stem) else os.path.join(pose_dir, fn)
+        jobs.append((pose, image_path, mask_path, agnostic_path, size))
+
+    print(f"Writing {len(jobs)} agnostic masks from {pose_dir}")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for _ in tqdm.tqdm(pool.map(mask_job, jobs, chunksize=64), total=len(jobs)):
+            pass
+    return len(jobs)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Build torso/arm agnostic masks from OpenPose keypoints')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--mask_dir', type=str, default=AGNOSTIC_MASK_DIR, help='Mask folder under --data_root')
+    parser.add_argument('--agnostic_dir', type=str, default=None, help='Also write grey-filled agnostic images here (e.g. agnostic-v3.2)')
+    parser.add_argument('--img_size', type=int, nargs=2, default=None, help='Mask height and width (default: the person image size)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--overwrite', action='store_true', help='Regenerate existing masks')
+    parser.add_argument('--keypoint_index', type=str, default=None, help='Read poses from a keypoint_index.py directory instead of JSON')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not os.path.exists(os.path.join(args.data_root, "openpose_json")):
+        print(f"Error: Keypoint directory {os.path.join(args.data_root, 'openpose_json')} not found!")
+        return
+    generate_agnostic_masks(args.data_root, args.mask_dir, args.agnostic_dir,
+                            tuple(args.img_size) if args.img_size else None, args.workers, args.overwrite,
+                            args.keypoint_index)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from functools import lru_cache
+import numpy as np
+
+from openpose import NUM_POSE_JOINTS, KEYPOINT_IMAGE_SIZE
+
+# Gaussian standard deviation as a fraction of the heatmap height (4 px at 512x384)
+SIGMA_FRACTION = 1 / 128
+# Kernels are cut off at this many standard deviations
+TRUNCATE = 3.0
+MIN_CONFIDENCE = 0.05
+# Default heatmaps match the VAE latent grid (64x48 for 512x384 images); full-size
+# float32 maps are 19 MiB per sample and cost ~4 ms to render, ~21 ms collated
+LATENT_STRIDE = 8
+
+@lru_cache(maxsize=8)
+def heatmap_kernel(height, width, dtype=np.float32):
+    """Cached (offsets, patch) for a heatmap size.
+
+    offsets is the (K,) int64 window of pixel offsets around a joint and patch
+    the (K, K) outer product of the 1D Gaussian with itself, scaled to 255
+    for uint8. Returned arrays are shared and must not be modified.
+    """
+    sigma = max(height * SIGMA_FRACTION, 1.0)
+    radius = int(np.ceil(TRUNCATE * sigma))
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    patch = np.outer(kernel, kernel)
+    if dtype == np.uint8:
+        patch = np.rint(patch * 255)
+    patch = patch.astype(dtype)
+    offsets.setflags(write=False)
+    patch.setflags(write=False)
+    return offsets, patch
+
+def render_heatmaps(poses, size, pose_size=KEYPOINT_IMAGE_SIZE, dtype=np.float32, min_confidence=MIN_CONFIDENCE):
+    """(..., 25, H, W) Gaussian heatmaps for (..., 25, 3) poses, peaking at 1 (255 for uint8).
+
+    Keypoints are scaled from pose_size to size, both (H, W), and rounded to
+    the nearest pixel, so every joint reuses the cached separable kernel of
+    the target size. All joints of the batch are written with one scatter of
+    their truncated windows; joints below min_confidence stay zero.
+    """
+    poses = np.asarray(poses, dtype=np.float32)
+    batch_shape = poses.shape[:-2]
+    poses = poses.reshape(-1, NUM_POSE_JOINTS, 3)
+    height, width = size
+    offsets, patch = heatmap_kernel(height, width, dtype)
+
+    # Zeroed pages are only touched around visible joints
+    heatmaps = np.zeros((len(poses) * NUM_POSE_JOINTS, height, width), dtype=dtype)
+    scale = np.array([width / pose_size[1], height / pose_size[0]], dtype=np.float32)
+    centres = np.rint(poses[:, :, :2] * scale).astype(np.int64).reshape(-1, 2)
+    channels = np.flatnonzero(poses[:, :, 2].reshape(-1) >= min_confidence)
+    if len(channels):
+        rows = centres[channels, 1, None] + offsets
+        cols = centres[channels, 0, None] + offsets
+        inside = ((rows >= 0) & (rows < height))[:, :, None] & ((cols >= 0) & (cols < width))[:, None, :]
+        channel, row, col = np.nonzero(inside)
+        heatmaps[channels[channel], rows[channel, row], cols[channel, col]] = patch[row, col]
+    return heatmaps.reshape(*batch_shape, NUM_POSE_JOINTS, height, width)
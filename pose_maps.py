@@ -0,0 +1,289 @@
+import os
+import colorsys
+import argparse
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+import tqdm
+
+from openpose import (NOSE, NECK, R_SHOULDER, R_ELBOW, R_WRIST, L_SHOULDER, L_ELBOW, L_WRIST, MID_HIP, R_HIP,
+                      R_KNEE, R_ANKLE, L_HIP, L_KNEE, L_ANKLE, R_EYE, L_EYE, R_EAR, L_EAR, L_BIG_TOE, L_SMALL_TOE,
+                      L_HEEL, R_BIG_TOE, R_SMALL_TOE, R_HEEL, NUM_POSE_JOINTS, KEYPOINTS_SUFFIX, KEYPOINT_IMAGE_SIZE,
+                      image_stem, read_pose)
+from pose_agnostic import MIN_CONFIDENCE, image_size
+from keypoint_index import KeypointIndex
+from sample_store import ensure_dir
+
+# Body parts in drawing order (later parts cover earlier ones); label = position + 1, 0 is background
+TORSO_PART = (R_SHOULDER, L_SHOULDER, L_HIP, R_HIP)
+# (joint a, joint b, radius as a fraction of the shoulder width)
+LIMB_PARTS = (
+    (NECK, NOSE, 0.30),
+    (R_HIP, R_KNEE, 0.22), (R_KNEE, R_ANKLE, 0.18), (L_HIP, L_KNEE, 0.22), (L_KNEE, L_ANKLE, 0.18),
+    (R_SHOULDER, R_ELBOW, 0.18), (R_ELBOW, R_WRIST, 0.15), (L_SHOULDER, L_ELBOW, 0.18), (L_ELBOW, L_WRIST, 0.15),
+)
+PART_NAMES = ("torso", "head", "right_thigh", "right_shin", "left_thigh", "left_shin",
+              "right_upper_arm", "right_forearm", "left_upper_arm", "left_forearm")
+# Label -> colour, background black as in DensePose renders
+PALETTE = np.array([(0, 0, 0), (20, 80, 194), (100, 170, 255), (0, 140, 100), (90, 200, 140), (140, 110, 30),
+                    (200, 170, 70), (170, 40, 150), (230, 110, 200), (210, 70, 40), (255, 150, 90)], dtype=np.uint8)
+
+# BODY_25 bones as drawn by OpenPose; skeleton label = bone + 1, then joint + 1 + len(BONES)
+BONES = ((NECK, MID_HIP), (NECK, R_SHOULDER), (NECK, L_SHOULDER), (R_SHOULDER, R_ELBOW), (R_ELBOW, R_WRIST),
+         (L_SHOULDER, L_ELBOW), (L_ELBOW, L_WRIST), (MID_HIP, R_HIP), (R_HIP, R_KNEE), (R_KNEE, R_ANKLE),
+         (MID_HIP, L_HIP), (L_HIP, L_KNEE), (L_KNEE, L_ANKLE), (NECK, NOSE), (NOSE, R_EYE), (R_EYE, R_EAR),
+         (NOSE, L_EYE), (L_EYE, L_EAR), (L_ANKLE, L_BIG_TOE), (L_BIG_TOE, L_SMALL_TOE), (L_ANKLE, L_HEEL),
+         (R_ANKLE, R_BIG_TOE), (R_BIG_TOE, R_SMALL_TOE), (R_ANKLE, R_HEEL))
+# Bone half-width and joint dot radius as fractions of the map height (2 and 3 px at 512)
+BONE_RADIUS = 1 / 256
+JOINT_RADIUS = 3 / 512
+# Pixels tested per vectorised call (padded window area times poses)
+WINDOW_BUDGET = 1 << 16
+_hues = [colorsys.hsv_to_rgb(i / len(BONES), 1.0, 1.0) for i in range(len(BONES))]
+SKELETON_PALETTE = np.array([(0, 0, 0)] + [tuple(round(c * 255) for c in rgb) for rgb in _hues]
+                            + [(255, 255, 255)] * NUM_POSE_JOINTS, dtype=np.uint8)
+
+@lru_cache(maxsize=8)
+def pixel_offsets(height, width):
+    """Cached float32 (ys (H,), xs (W,)) pixel offsets for a map size; windows slice them instead of calling arange.
+
+    Returned arrays are shared and must not be modified.
+    """
+    ys, xs = np.arange(height, dtype=np.float32), np.arange(width, dtype=np.float32)
+    ys.setflags(write=False)
+    xs.setflags(write=False)
+    return ys, xs
+
+@lru_cache(maxsize=8)
+def joint_stamp(height):
+    """Cached (dy, dx) int64 offsets of the pixels of a joint dot on a map of this height.
+
+    Returned arrays are shared and must not be modified.
+    """
+    radius = max(height * JOINT_RADIUS, 1.0)
+    reach = int(np.ceil(radius))
+    offsets = np.arange(-reach, reach + 1)
+    dy, dx = np.nonzero(offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius * radius)
+    dy, dx = offsets[dy], offsets[dx]
+    dy.setflags(write=False)
+    dx.setflags(write=False)
+    return dy, dx
+
+def paint_windows(labels, rows, lo, hi, inside_fn, label, budget=WINDOW_BUDGET):
+    """Paint `label` into (B, H, W) labels for selected poses, testing one window per pose.
+
+    rows picks the poses, lo/hi (n, 2) are their (x, y) bounds. Poses are
+    sorted by box size and taken in chunks whose windows, padded to the
+    chunk's largest box, hold about `budget` pixels, and each chunk goes
+    through inside_fn(k, ys (c, Kh, 1), xs (c, 1, Kw)) -> (c, Kh, Kw) in one
+    call, k being the chunk's indices into rows. Small parts thus batch many
+    poses per call while large ones stay cache-sized.
+    """
+    if len(rows) == 0:
+        return labels
+    height, width = labels.shape[1:]
+    offset_y, offset_x = pixel_offsets(height, width)
+    x0, y0 = np.floor(lo).astype(np.int64).clip(0, [width, height]).T
+    x1, y1 = (np.ceil(hi).astype(np.int64) + 1).clip(0, [width, height]).T
+    box_h, box_w = np.maximum(y1 - y0, 0), np.maximum(x1 - x0, 0)
+    order = np.argsort(box_h * box_w, kind="stable")
+    start = 0
+    while start < len(order):
+        # Grow the chunk while its padded window stays within budget
+        stop = start + 1
+        kh, kw = box_h[order[start]], box_w[order[start]]
+        while stop < len(order):
+            nh, nw = max(kh, box_h[order[stop]]), max(kw, box_w[order[stop]])
+            if nh * nw * (stop - start + 1) > budget:
+                break
+            kh, kw, stop = nh, nw, stop + 1
+        k = order[start:stop]
+        start = stop
+        if kh <= 0 or kw <= 0:
+            continue
+        ys = y0[k, None] + offset_y[:kh]
+        xs = x0[k, None] + offset_x[:kw]
+        inside = inside_fn(k, ys[:, :, None], xs[:, None, :])
+        # Writing through each pose's own box is much cheaper than a fancy-index scatter
+        for c, i in enumerate(k):
+            window = labels[rows[i], y0[i]:y1[i], x0[i]:x1[i]]
+            np.copyto(window, label, where=inside[c, :window.shape[0], :window.shape[1]])
+    return labels
+
+def paint_polygons(labels, rows, points, label):
+    """Paint convex polygons points (n, V, 2) of the poses in rows"""
+    def inside(k, ys, xs):
+        positive = np.ones((len(k), ys.shape[1], xs.shape[2]), dtype=bool)
+        negative = positive.copy()
+        chunk = points[k]
+        for a, b in zip(chunk.transpose(1, 0, 2), np.roll(chunk, -1, axis=1).transpose(1, 0, 2)):
+            ax, ay, bx, by = (v[:, None, None] for v in (a[:, 0], a[:, 1], b[:, 0], b[:, 1]))
+            cross = (bx - ax) * (ys - ay) - (by - ay) * (xs - ax)
+            positive &= cross >= 0
+            negative &= cross <= 0
+        return positive | negative
+    return paint_windows(labels, rows, points.min(axis=1), points.max(axis=1), inside, label)
+
+def paint_capsules(labels, rows, a, b, radius, label):
+    """Paint the pixels within radius (n,) of the segments a-b (n, 2) of the poses in rows"""
+    def inside(k, ys, xs):
+        ys = ys - a[k, 1, None, None]
+        xs = xs - a[k, 0, None, None]
+        ab = b[k] - a[k]
+        t = (xs * ab[:, 0, None, None] + ys * ab[:, 1, None, None]) / np.maximum((ab * ab).sum(axis=1), 1e-6)[:, None, None]
+        np.clip(t, 0, 1, out=t)
+        dx, dy = xs - t * ab[:, 0, None, None], ys - t * ab[:, 1, None, None]
+        return dx * dx + dy * dy <= (radius[k] * radius[k])[:, None, None]
+    return paint_windows(labels, rows, np.minimum(a, b) - radius[:, None], np.maximum(a, b) + radius[:, None],
+                         inside, label)
+
+def paint_joints(labels, rows, centres, label):
+    """Stamp the cached joint dot at the (n, 2) (x, y) centres of the poses in rows, rounded to the nearest pixel"""
+    height, width = labels.shape[1:]
+    dy, dx = joint_stamp(height)
+    centres = np.rint(centres).astype(np.int64)
+    ys = centres[:, 1, None] + dy
+    xs = centres[:, 0, None] + dx
+    inside = (ys >= 0) & (ys < height) & (xs >= 0) & (xs < width)
+    labels[np.broadcast_to(rows[:, None], ys.shape)[inside], ys[inside], xs[inside]] = label
+    return labels
+
+def scale_poses(poses, size, pose_size):
+    """(B, 25, 2) keypoints scaled from pose_size to size (both (H, W)) and (B, 25) visibility"""
+    poses = np.asarray(poses, dtype=np.float32).reshape(-1, NUM_POSE_JOINTS, 3)
+    height, width = size
+    points = poses[:, :, :2] * np.array([width / pose_size[1], height / pose_size[0]], dtype=np.float32)
+    return points, poses[:, :, 2] >= MIN_CONFIDENCE
+
+def render_part_labels(poses, size=KEYPOINT_IMAGE_SIZE, pose_size=KEYPOINT_IMAGE_SIZE):
+    """(B, H, W) uint8 body-part label maps for (B, 25, 3) poses (see PART_NAMES; 0 is background).
+
+    Each part is tested for the whole batch at once, over a window around
+    each pose's part rather than the full map. Poses without both shoulders
+    give an empty map.
+    """
+    points, seen = scale_poses(poses, size, pose_size)
+    labels = np.zeros((len(points),) + tuple(size), dtype=np.uint8)
+    shoulders = seen[:, R_SHOULDER] & seen[:, L_SHOULDER]
+    shoulder_width = np.linalg.norm(points[:, R_SHOULDER] - points[:, L_SHOULDER], axis=1)
+
+    rows = np.flatnonzero(shoulders & seen[:, list(TORSO_PART)].all(axis=1))
+    paint_polygons(labels, rows, points[rows][:, list(TORSO_PART)], 1)
+    for label, (i, j, radius) in enumerate(LIMB_PARTS, start=2):
+        rows = np.flatnonzero(shoulders & seen[:, i] & seen[:, j])
+        paint_capsules(labels, rows, points[rows, i], points[rows, j], radius * shoulder_width[rows], label)
+    return labels
+
+def render_skeleton_labels(poses, size=KEYPOINT_IMAGE_SIZE, pose_size=KEYPOINT_IMAGE_SIZE):
+    """(B, H, W) uint8 skeleton label maps: bone lines (labels 1-24) with joint dots on top.
+
+    Line width scales with the map height, so maps look alike at any size.
+    Joint dots are one cached stamp per map size (see joint_stamp).
+    """
+    points, seen = scale_poses(poses, size, pose_size)
+    labels = np.zeros((len(points),) + tuple(size), dtype=np.uint8)
+    bone_radius = max(size[0] * BONE_RADIUS, 1.0)
+    for label, (i, j) in enumerate(BONES, start=1):
+        rows = np.flatnonzero(seen[:, i] & seen[:, j])
+        paint_capsules(labels, rows, points[rows, i], points[rows, j],
+                       np.full(len(rows), bone_radius, dtype=np.float32), label)
+    for joint in range(NUM_POSE_JOINTS):
+        rows = np.flatnonzero(seen[:, joint])
+        paint_joints(labels, rows, points[rows, joint], len(BONES) + 1 + joint)
+    return labels
+
+def render_pose_maps(poses, size=KEYPOINT_IMAGE_SIZE, pose_size=KEYPOINT_IMAGE_SIZE):
+    """(B, H, W, 3) uint8 colour part maps for (B, 25, 3) poses, for use in place of image-densepose"""
+    return np.take(PALETTE, render_part_labels(poses, size, pose_size), axis=0)
+
+def render_skeleton_maps(poses, size=KEYPOINT_IMAGE_SIZE, pose_size=KEYPOINT_IMAGE_SIZE):
+    """(B, H, W, 3) uint8 OpenPose-style skeleton renderings for (B, 25, 3) poses"""
+    return np.take(SKELETON_PALETTE, render_skeleton_labels(poses, size, pose_size), axis=0)
+
+def part_labels(pose, size=KEYPOINT_IMAGE_SIZE, pose_size=KEYPOINT_IMAGE_SIZE):
+    """render_part_labels for one (25, 3) pose"""
+    return render_part_labels(pose, size, pose_size)[0]
+
+def pose_map(pose, size=KEYPOINT_IMAGE_SIZE, pose_size=KEYPOINT_IMAGE_SIZE):
+    """render_pose_maps for one (25, 3) pose"""
+    return render_pose_maps(pose, size, pose_size)[0]
+
+def pose_map_job(job):
+    """Pool worker: render and save the part (and optionally skeleton) maps of a batch of same-size poses"""
+    poses, output_paths, skeleton_paths, size = job
+    poses = np.stack([pose if isinstance(pose, np.ndarray) else read_pose(pose) for pose in poses])
+    for img, path in zip(render_pose_maps(poses, size), output_paths):
+        Image.fromarray(img).save(path, quality=95)
+    if skeleton_paths:
+        for img, path in zip(render_skeleton_maps(poses, size), skeleton_paths):
+            Image.fromarray(img).save(path)
+    return len(output_paths)
+
+def fill_densepose(data_root, folder="image-densepose", size=None, workers=None, overwrite=False,
+                   keypoint_index=None, skeleton_dir=None, batch_size=16):
+    """Render a pose map for every person in <data_root>/openpose_json without one in <data_root>/<folder>.
+
+    Maps are written as <folder>/<image stem>.jpg at the person image's size,
+    or at size = (H, W) if given (1024x768 when the image is absent), where
+    StableVITONDataset looks for DensePose inputs. Existing files, such as
+    real DensePose renders, are kept unless overwrite is set. With
+    skeleton_dir, OpenPose-style skeletons are also written there as
+    <image stem>_rendered.png, as in VITON-HD's openpose_img. People of the
+    same size are rendered batch_size at a time. With keypoint_index, poses
+    are read from its arrays instead of parsing JSON.
+    """
+    index = KeypointIndex(keypoint_index) if keypoint_index else None
+    pose_dir = os.path.join(data_root, "openpose_json")
+    ensure_dir(os.path.join(data_root, folder))
+    if skeleton_dir:
+        ensure_dir(os.path.join(data_root, skeleton_dir))
+    by_size = {}
+    for fn in sorted(os.listdir(pose_dir)):
+        if not fn.endswith(KEYPOINTS_SUFFIX):
+            continue
+        stem = image_stem(fn)
+        output_path = os.path.join(data_root, folder, stem + ".jpg")
+        if not overwrite and os.path.exists(output_path):
+            continue
+        skeleton_path = os.path.join(data_root, skeleton_dir, stem + "_rendered.png") if skeleton_dir else None
+        pose = np.array(index.get(stem)) if index is not None and index.has(stem) else os.path.join(pose_dir, fn)
+        map_size = size or image_size(os.path.join(data_root, "image", stem + ".jpg"))
+        by_size.setdefault(map_size, []).append((pose, output_path, skeleton_path))
+
+    jobs = []
+    for map_size, people in by_size.items():
+        for start in range(0, len(people), batch_size):
+            poses, outputs, skeletons = zip(*people[start:start + batch_size])
+            jobs.append((list(poses), list(outputs), list(skeletons) if skeleton_dir else None, map_size))
+    total = sum(len(people) for people in by_size.values())
+
+    print(f"Rendering {total} pose maps into {os.path.join(data_root, folder)}")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        with tqdm.tqdm(total=total) as progress:
+            for count in pool.map(pose_map_job, jobs):
+                progress.update(count)
+    return total
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Render OpenPose keypoints into body-part maps for missing DensePose inputs')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--folder', type=str, default='image-densepose', help='Output folder under --data_root')
+    parser.add_argument('--skeleton_dir', type=str, default=None, help='Also write skeleton maps here (e.g. openpose_img)')
+    parser.add_argument('--img_size', type=int, nargs=2, default=None, help='Map height and width (default: the person image size)')
+    parser.add_argument('--batch_size', type=int, default=16, help='Poses rendered together by a worker')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--overwrite', action='store_true', help='Replace existing files, including real DensePose renders')
+    parser.add_argument('--keypoint_index', type=str, default=None, help='Read poses from a keypoint_index.py directory instead of JSON')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not os.path.exists(os.path.join(args.data_root, "openpose_json")):
+        print(f"Error: Keypoint directory {os.path.join(args.data_root, 'openpose_json')} not found!")
+        return
+    fill_densepose(args.data_root, args.folder, tuple(args.img_size) if args.img_size else None, args.workers,
+                   args.overwrite, args.keypoint_index, args.skeleton_dir, args.batch_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import os
+import time
+import argparse
+import numpy as np
+
+from openpose import (NOSE, NECK, R_SHOULDER, R_ELBOW, R_WRIST, L_SHOULDER, L_ELBOW, L_WRIST, MID_HIP, R_HIP,
+                      L_HIP, R_EYE, L_EYE, R_EAR, L_EAR, KEYPOINTS_SUFFIX, image_stem, read_pose)
+from pair_table import read_pairs
+
+INDEX_FILE = "pose_index.npz"
+# VITON-HD photos are usually cropped at the thighs, so legs are left out by default
+UPPER_BODY = (NOSE, NECK, R_SHOULDER, R_ELBOW, R_WRIST, L_SHOULDER, L_ELBOW, L_WRIST, MID_HIP, R_HIP, L_HIP,
+              R_EYE, L_EYE, R_EAR, L_EAR)
+MIN_CONFIDENCE = 0.1
+# Minimum summed joint weight two poses must share to be compared
+MIN_OVERLAP = 2.0
+
+def normalise_poses(poses, joints=UPPER_BODY, min_confidence=MIN_CONFIDENCE):
+    """Centre (N, 25, 3) poses on the neck and scale them by shoulder width.
+
+    Returns (coords, weights): (N, J, 2) float32 normalised positions of the
+    selected joints and (N, J) weights, the joint confidence or 0 below
+    min_confidence. Poses without a neck and both shoulders get zero weights.
+    """
+    poses = np.asarray(poses, dtype=np.float32).reshape(-1, 25, 3)
+    neck = poses[:, NECK, :2]
+    width = np.linalg.norm(poses[:, R_SHOULDER, :2] - poses[:, L_SHOULDER, :2], axis=1)
+    valid = (poses[:, [NECK, R_SHOULDER, L_SHOULDER], 2] >= min_confidence).all(axis=1) & (width > 1e-3)
+    scale = np.where(valid, width, 1.0)
+
+    selected = poses[:, list(joints)]
+    coords = (selected[:, :, :2] - neck[:, None]) / scale[:, None, None]
+    weights = np.where(selected[:, :, 2] >= min_confidence, selected[:, :, 2], 0.0)
+    weights *= valid[:, None]
+    return coords.astype(np.float32), weights.astype(np.float32)
+
+class PoseIndex:
+    """Nearest-neighbour search over normalised skeletons with confidence masking.
+
+    The distance between two poses is the mean squared distance of their
+    joints, weighted by the product of both joints' confidences, so a joint
+    missing in either pose does not count. Because the set of joints differs
+    per pair, the distance is not a metric and tree pruning does not apply.
+    A batch of queries is therefore answered exactly with three matrix
+    products against all N poses (well under a millisecond per query at
+    N = 11k), followed by a partial sort for the top k.
+    """
+
+    def __init__(self, names, coords, weights, joints=UPPER_BODY):
+        self.names = list(names)
+        self.rows = {name: i for i, name in enumerate(self.names)}
+        self.coords = np.ascontiguousarray(coords, dtype=np.float32)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.joints = tuple(int(j) for j in joints)
+        # Per-pose terms of the expanded squared distance
+        self._weighted = self.coords * self.weights[:, :, None]
+        self._sq = (self.coords ** 2).sum(axis=2) * self.weights
+
+    @classmethod
+    def build(cls, names, poses, joints=UPPER_BODY, min_confidence=MIN_CONFIDENCE):
+        coords, weights = normalise_poses(poses, joints, min_confidence)
+        return cls(names, coords, weights, joints)
+
+    def save(self, path):
+        np.savez(path, names=np.array(self.names), coords=self.coords, weights=self.weights,
+                 joints=np.array(self.joints))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["names"].tolist(), data["coords"], data["weights"], data["joints"].tolist())
+
+    def __len__(self):
+        return len(self.names)
+
+    def distances(self, coords, weights):
+        """(B, N) weighted mean squared distances from B normalised queries to every pose (inf without overlap)"""
+        sq = (coords ** 2).sum(axis=2) * weights
+        overlap = weights @ self.weights.T
+        total = sq @ self.weights.T + weights @ self._sq.T
+        total -= 2 * (coords[:, :, 0] * weights) @ self._weighted[:, :, 0].T
+        total -= 2 * (coords[:, :, 1] * weights) @ self._weighted[:, :, 1].T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dist = np.maximum(total, 0) / overlap
+        dist[overlap < MIN_OVERLAP] = np.inf
+        return dist
+
+    def query_batch(self, poses, k=5, exclude=None, chunk_size=1024):
+        """Top-k neighbours of (B, 25, 3) raw poses.
+
+        Args:
+            exclude: Optional (B,) row per query to leave out (e.g. the query itself); -1 for none
+        Returns:
+            (rows, distances), both (B, k), nearest first; rows are -1 (distance inf) past the last match
+        """
+        coords, weights = normalise_poses(poses, self.joints)
+        return self._query(coords, weights, k, exclude, chunk_size)
+
+    def _query(self, coords, weights, k, exclude=None, chunk_size=1024):
+        k = min(k, len(self))
+        rows = np.empty((len(coords), k), dtype=np.int64)
+        dists = np.empty((len(coords), k), dtype=np.float32)
+        for start in range(0, len(coords), chunk_size):
+            dist = self.distances(coords[start:start + chunk_size], weights[start:start + chunk_size])
+            if exclude is not None:
+                skip = np.asarray(exclude[start:start + chunk_size])
+                has = skip >= 0
+                dist[np.nonzero(has)[0], skip[has]] = np.inf
+            top = np.argpartition(dist, k - 1, axis=1)[:, :k] if k < dist.shape[1] else np.tile(np.arange(k), (len(dist), 1))
+            top_dist = np.take_along_axis(dist, top, axis=1)
+            order = np.argsort(top_dist, axis=1, kind="stable")
+            rows[start:start + len(dist)] = np.take_along_axis(top, order, axis=1)
+            dists[start:start + len(dist)] = np.take_along_axis(top_dist, order, axis=1)
+        rows[~np.isfinite(dists)] = -1
+        return rows, dists
+
+    def query(self, pose, k=5):
+        """Top-k (name, distance) neighbours of one raw (25, 3) pose"""
+        rows, dists = self.query_batch(np.asarray(pose)[None], k)
+        return [(self.names[r], float(d)) for r, d in zip(rows[0], dists[0]) if r >= 0]
+
+    def row(self, name):
+        """Row of a person by image name or stem, or None if they are not indexed"""
+        return self.rows.get(os.path.splitext(name)[0])
+
+    def query_names(self, names, k=5):
+        """Top-k neighbours of indexed people by name, excluding each person themselves"""
+        query_rows = np.array([self.row(name) for name in names], dtype=np.int64)
+        return self._query(self.coords[query_rows], self.weights[query_rows], k, exclude=query_rows)
+
+def load_poses(data_root, keypoint_index=None):
+    """(names, (N, 25, 3) poses) for a split, from a keypoint_index.py directory if given, else from JSON"""
+    if keypoint_index:
+        from keypoint_index import KeypointIndex
+        index = KeypointIndex(keypoint_index)
+        names = sorted(index.rows, key=index.rows.get)
+        return names, np.asarray(index.array("pose"))
+    pose_dir = os.path.join(data_root, "openpose_json")
+    files = sorted(f for f in os.listdir(pose_dir) if f.endswith(KEYPOINTS_SUFFIX))
+    return [image_stem(f) for f in files], np.stack([read_pose(os.path.join(pose_dir, f)) for f in files])
+
+def pose_matched_pairs(index, pairs, k=10, max_uses=1):
+    """Unpaired evaluation list: each person with the garment of a near-pose neighbour.
+
+    Neighbours come from one batched top-k query. Average-looking poses are
+    the nearest neighbour of hundreds of people, so each person takes the
+    garment of their nearest neighbour whose garment has been handed out
+    fewer than max_uses times, falling back to the nearest one. A person
+    without a usable pose or neighbour keeps their own garment.
+    """
+    cloth_of = {os.path.splitext(im)[0]: c for im, c in pairs}
+    known = [i for i, (im, _) in enumerate(pairs) if index.row(im) is not None]
+    rows, _ = index.query_names([pairs[i][0] for i in known], k=k)
+    matched = list(pairs)
+    uses = {}
+    for i, candidates in zip(known, rows):
+        garments = [cloth_of[index.names[r]] for r in candidates if r >= 0 and index.names[r] in cloth_of]
+        if not garments:
+            continue
+        cloth = next((c for c in garments if uses.get(c, 0) < max_uses), garments[0])
+        uses[cloth] = uses.get(cloth, 0) + 1
+        matched[i] = (pairs[i][0], cloth)
+    return matched
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Build or query a pose nearest-neighbour index over a split')
+    parser.add_argument('--data_root', type=str, default='train', help='Path to data directory (train or test)')
+    parser.add_argument('--index', type=str, default=None, help='Index file (default: <data_root>/pose_index.npz)')
+    parser.add_argument('--keypoint_index', type=str, default=None, help='Read poses from a keypoint_index.py directory instead of JSON')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the index even if the file exists')
+    parser.add_argument('--query', type=str, nargs='*', default=[], help='Image names to find neighbours for')
+    parser.add_argument('--k', type=int, default=5, help='Neighbours per query')
+    parser.add_argument('--pairs_file', type=str, default=None, help='Pairs file to build a pose-matched unpaired list from')
+    parser.add_argument('--unpaired_out', type=str, default=None, help='Where to write the pose-matched unpaired list')
+    parser.add_argument('--max_uses', type=int, default=1, help='Times a garment may be reused in the unpaired list before falling back')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    index_path = args.index or os.path.join(args.data_root, INDEX_FILE)
+    if os.path.exists(index_path) and not args.rebuild:
+        index = PoseIndex.load(index_path)
+        print(f"Loaded pose index of {len(index)} people from {index_path}")
+    else:
+        if not args.keypoint_index and not os.path.exists(os.path.join(args.data_root, "openpose_json")):
+            print(f"Error: Keypoint directory {os.path.join(args.data_root, 'openpose_json')} not found!")
+            return
+        names, poses = load_poses(args.data_root, args.keypoint_index)
+        index = PoseIndex.build(names, poses)
+        index.save(index_path)
+        print(f"Indexed {len(index)} poses into {index_path}")
+
+    missing = [name for name in args.query if index.row(name) is None]
+    if missing:
+        print(f"Error: {', '.join(missing)} not found in the pose index!")
+        return
+    if args.query:
+        start = time.perf_counter()
+        rows, dists = index.query_names(args.query, args.k)
+        elapsed = time.perf_counter() - start
+        for name, row_ids, row_dists in zip(args.query, rows, dists):
+            matches = ", ".join(f"{index.names[r]} ({d:.3f})" for r, d in zip(row_ids, row_dists) if r >= 0)
+            print(f"{name}: {matches}")
+        print(f"Answered {len(args.query)} queries in {elapsed * 1000:.2f} ms")
+
+    if args.unpaired_out:
+        pairs = read_pairs(args.pairs_file or f"{args.data_root}_pairs.txt")
+        matched = pose_matched_pairs(index, pairs, max(args.k, 10), args.max_uses)
+        with open(args.unpaired_out, "w") as f:
+            f.writelines(f"{im} {c}\n" for im, c in matched)
+        changed = sum(a != b for a, b in zip(pairs, matched))
+        print(f"Wrote {len(matched)} pose-matched pairs ({changed} with a neighbour's garment) to {args.unpaired_out}")
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ import argparse
 import subprocess
 import sys
 
+from sample_store import MODALITIES
+from pair_sharding import add_shard_args, shard_pairs
+
 def parse_args():
     parser = argparse.ArgumentParser(description='Run StableVITON inference')
     parser.add_argument('--data_dir', type=str, default='test', help='Directory with test data')
@@ -10,25 +13,50 @@ def parse_args():
     parser.add_argument('--batch_size', type=int, default=4, help='Batch size for inference')
     parser.add_argument('--pairs_file', type=str, default='test_pairs.txt', help='Text file with test pairs')
     parser.add_argument('--use_vae', action='store_true', help='Use VAE fine-tuning checkpoint')
+    parser.add_argument('--max_pairs', type=int, default=10, help='Pairs each rank processes, taken from its shard (0 for all)')
+    add_shard_args(parser)
     return parser.parse_args()
 
+def rank_dirs(args):
+    """(data root, save dir) for this process.
+
+    With --world_size > 1 every rank copies its pairs into its own
+    StableVITON/data_r<rank> root and saves into <output_dir>/r<rank>, so
+    ranks neither run inference over each other's pairs nor overwrite each
+    other's results.
+    """
+    if args.world_size > 1:
+        return os.path.join("StableVITON", f"data_r{args.rank}"), os.path.join(args.output_dir, f"r{args.rank}")
+    return os.path.join("StableVITON", "data"), args.output_dir
+
 def prepare_data_structure(args):
     """Creates symbolic links to organize data for StableVITON inference."""
     print("Preparing data structure...")
+    data_root, _ = rank_dirs(args)
+    test_dir = os.path.join(data_root, "test")
     
     # Create necessary directories
-    os.makedirs("StableVITON/data/test/image", exist_ok=True)
-    os.makedirs("StableVITON/data/test/cloth", exist_ok=True)
-    os.makedirs("StableVITON/data/test/cloth-mask", exist_ok=True)
-    os.makedirs("StableVITON/data/test/image-densepose", exist_ok=True)
-    os.makedirs("StableVITON/data/test/agnostic-v3.2", exist_ok=True)
-    os.makedirs("StableVITON/data/test/agnostic-mask", exist_ok=True)
+    for folder in ("image", "cloth", "cloth-mask", "image-densepose", "agnostic-v3.2", "agnostic-mask"):
+        os.makedirs(os.path.join(test_dir, folder), exist_ok=True)
     
     # Copy or symlink data files based on pairs file
     with open(args.pairs_file, 'r') as f:
         pairs = f.readlines()
     
-    for i, pair in enumerate(pairs[:min(10, len(pairs))]):  # Process first 10 pairs for testing
+    # Split the full pair list between processes when run with --world_size > 1,
+    # then keep the first --max_pairs of this rank's share
+    names = [tuple(line.split()[:2]) if len(line.split()) >= 2 else ("", "") for line in pairs]
+    pairs = [pairs[i] for i in shard_pairs(names, args.rank, args.world_size,
+                                           args.data_dir, MODALITIES, args.balance)]
+    if args.max_pairs > 0:
+        pairs = pairs[:args.max_pairs]
+    
+    # StableVITON reads <data_root_dir>/test_pairs.txt; a rank root lists only its own pairs
+    if args.world_size > 1:
+        with open(os.path.join(data_root, "test_pairs.txt"), "w") as f:
+            f.writelines(pair.strip() + "\n" for pair in pairs if len(pair.split()) >= 2)
+    
+    for i, pair in enumerate(pairs):
         try:
             pair = pair.strip()
             if not pair:
@@ -44,47 +72,47 @@ def prepare_data_structure(args):
             # Copy necessary files (using PowerShell commands for Windows)
             # Person image
             src_path = os.path.join(args.data_dir, "image", image_name)
-            dst_path = os.path.join("StableVITON", "data", "test", "image", image_name)
+            dst_path = os.path.join(test_dir, "image", image_name)
             if os.path.exists(src_path):
                 copy_cmd = f'Copy-Item -Path "{src_path}" -Destination "{dst_path}" -Force'
                 subprocess.run(["powershell", "-Command", copy_cmd], check=False)
             
             # Cloth image
             src_path = os.path.join(args.data_dir, "cloth", cloth_name)
-            dst_path = os.path.join("StableVITON", "data", "test", "cloth", cloth_name)
+            dst_path = os.path.join(test_dir, "cloth", cloth_name)
             if os.path.exists(src_path):
                 copy_cmd = f'Copy-Item -Path "{src_path}" -Destination "{dst_path}" -Force'
                 subprocess.run(["powershell", "-Command", copy_cmd], check=False)
             
             # Cloth mask
             src_path = os.path.join(args.data_dir, "cloth-mask", cloth_name)
-            dst_path = os.path.join("StableVITON", "data", "test", "cloth-mask", cloth_name)
+            dst_path = os.path.join(test_dir, "cloth-mask", cloth_name)
             if os.path.exists(src_path):
                 copy_cmd = f'Copy-Item -Path "{src_path}" -Destination "{dst_path}" -Force'
                 subprocess.run(["powershell", "-Command", copy_cmd], check=False)
             
             # Densepose image
             src_path = os.path.join(args.data_dir, "image-densepose", image_name)
-            dst_path = os.path.join("StableVITON", "data", "test", "image-densepose", image_name)
+            dst_path = os.path.join(test_dir, "image-densepose", image_name)
             if os.path.exists(src_path):
                 copy_cmd = f'Copy-Item -Path "{src_path}" -Destination "{dst_path}" -Force'
                 subprocess.run(["powershell", "-Command", copy_cmd], check=False)
             
             # Agnostic image
             src_path = os.path.join(args.data_dir, "agnostic-v3.2", image_name)
-            dst_path = os.path.join("StableVITON", "data", "test", "agnostic-v3.2", image_name)
+            dst_path = os.path.join(test_dir, "agnostic-v3.2", image_name)
             if os.path.exists(src_path):
                 copy_cmd = f'Copy-Item -Path "{src_path}" -Destination "{dst_path}" -Force'
                 subprocess.run(["powershell", "-Command", copy_cmd], check=False)
             
             # Agnostic mask
             src_path = os.path.join(args.data_dir, "agnostic-mask", image_name)
-            dst_path = os.path.join("StableVITON", "data", "test", "agnostic-mask", image_name)
+            dst_path = os.path.join(test_dir, "agnostic-mask", image_name)
             if os.path.exists(src_path):
                 copy_cmd = f'Copy-Item -Path "{src_path}" -Destination "{dst_path}" -Force'
                 subprocess.run(["powershell", "-Command", copy_cmd], check=False)
                 
-            print(f"Processed pair {i+1}/{min(10, len(pairs))}: {image_name} + {cloth_name}")
+            print(f"Processed pair {i+1}/{len(pairs)}: {image_name} + {cloth_name}")
             
         except Exception as e:
             print(f"Error processing pair {pair}: {e}")
@@ -117,6 +145,7 @@ def configure_vae(use_vae):
 def run_inference(args):
     """Run the StableVITON inference script."""
     print("Running inference with StableVITON...")
+    data_root, save_dir = rank_dirs(args)
     
     # Install required packages if needed
     try:
@@ -132,8 +161,8 @@ def run_inference(args):
         "--config_path", "StableVITON/configs/VITONHD.yaml",
         "--model_load_path", "StableVITON/ckpts/VITONHD_PBE_pose.ckpt",
         "--batch_size", str(args.batch_size),
-        "--data_root_dir", "StableVITON/data",
-        "--save_dir", args.output_dir,
+        "--data_root_dir", data_root,
+        "--save_dir", save_dir,
         "--denoise_steps", "50",
         "--img_H", "512",
         "--img_W", "384"
@@ -149,7 +178,7 @@ def run_inference(args):
         print(f"Inference failed with return code {process.returncode}")
         return False
     else:
-        print(f"Inference completed successfully. Results saved to {args.output_dir}")
+        print(f"Inference completed successfully. Results saved to {save_dir}")
         return True
 
 def main():
@@ -6,6 +6,8 @@ import time
 import argparse
 from PIL import Image
 
+from cloth_masks import save_cloth_mask
+
 def ensure_dir(path):
     """Create directory if it doesn't exist"""
     os.makedirs(path, exist_ok=True)
@@ -154,15 +156,8 @@ def fallback_to_train_pair():
 def create_mask(image_path, output_path):
     """Create a mask for the clothing item"""
     try:
-        # Open the clothing image
-        img = Image.open(image_path).convert('RGB')
-        
-        # Create a white mask - this is simplistic but works as a fallback
-        width, height = img.size
-        mask = Image.new('L', (width, height), 255)
-        
-        # Save the mask
-        mask.save(output_path)
+        # Alpha or non-white foreground, keeping only the garment's largest component
+        save_cloth_mask(image_path, output_path, "largest")
         print(f"Created mask at {output_path}")
     except Exception as e:
         print(f"Error creating mask: {e}")
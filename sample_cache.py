@@ -0,0 +1,123 @@
+import hashlib
+import multiprocessing
+from collections import OrderedDict
+import numpy as np
+import torch
+
+class DecodedCache:
+    """Byte-budgeted LRU cache of decoded, resized modalities.
+
+    Keys are (modality, filename, size) tuples and values are (H, W, C) uint8
+    arrays. Each process (including each DataLoader worker) has its own copy.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        array = self.entries.get(key)
+        if array is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return array
+
+    def put(self, key, array):
+        if key in self.entries or array.nbytes > self.max_bytes:
+            return
+        self.entries[key] = array
+        self.bytes += array.nbytes
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self.entries), "bytes": self.bytes}
+
+def key_hash(key):
+    """Stable non-zero 64-bit hash of a cache key (0 marks an empty slot)"""
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True) or 1
+
+class SharedDecodedCache:
+    """LRU cache of decoded modalities backed by shared-memory tensors.
+
+    Entries live in fixed-size slots of one shared uint8 slab sized for an
+    RGB image at `img_size`, so a hit decoded by one DataLoader worker is
+    visible to every other worker and the main process. Lookups are a
+    vectorised scan of the slot keys and take no lock; a reader re-checks the
+    slot key after copying, so an entry evicted mid-read counts as a miss.
+    Inserts and evictions are serialised by a lock. Hit/miss counters are
+    shared and updated without locking, so they are approximate.
+    """
+
+    def __init__(self, max_bytes, img_size):
+        height, width = img_size
+        self.img_size = tuple(img_size)
+        self.slot_bytes = height * width * 3
+        num_slots = max(1, max_bytes // self.slot_bytes)
+        self.slab = torch.zeros((num_slots, self.slot_bytes), dtype=torch.uint8).share_memory_()
+        self.keys = torch.zeros(num_slots, dtype=torch.int64).share_memory_()
+        self.channels = torch.zeros(num_slots, dtype=torch.int64).share_memory_()
+        self.last_used = torch.zeros(num_slots, dtype=torch.int64).share_memory_()
+        # hits, misses, LRU clock
+        self.counters = torch.zeros(3, dtype=torch.int64).share_memory_()
+        self.lock = multiprocessing.Lock()
+
+    def _tick(self):
+        self.counters[2] += 1
+        return int(self.counters[2])
+
+    def get(self, key):
+        if tuple(key[2]) != self.img_size:
+            self.counters[1] += 1
+            return None
+        h = key_hash(key)
+        slots = (self.keys == h).nonzero()
+        if len(slots) == 0:
+            self.counters[1] += 1
+            return None
+        slot = int(slots[0])
+        height, width = self.img_size
+        channels = int(self.channels[slot])
+        array = self.slab[slot, :height * width * channels].numpy().copy()
+        if int(self.keys[slot]) != h:
+            self.counters[1] += 1
+            return None
+        self.last_used[slot] = self._tick()
+        self.counters[0] += 1
+        return array.reshape(height, width, channels)
+
+    def put(self, key, array):
+        if tuple(key[2]) != self.img_size or array.nbytes > self.slot_bytes:
+            return
+        h = key_hash(key)
+        with self.lock:
+            if bool((self.keys == h).any()):
+                return
+            slot = int(torch.argmin(self.last_used))
+            self.keys[slot] = 0
+            flat = torch.from_numpy(np.ascontiguousarray(array).reshape(-1))
+            self.slab[slot, :flat.numel()] = flat
+            self.channels[slot] = array.shape[2]
+            self.last_used[slot] = self._tick()
+            self.keys[slot] = h
+
+    def stats(self):
+        entries = int((self.keys != 0).sum())
+        return {"hits": int(self.counters[0]), "misses": int(self.counters[1]),
+                "entries": entries, "bytes": entries * self.slot_bytes}
+
+def make_cache(max_bytes, img_size, shared=False):
+    """Build a decoded-modality cache, or None if `max_bytes` is 0"""
+    if max_bytes <= 0:
+        return None
+    if shared:
+        return SharedDecodedCache(max_bytes, img_size)
+    return DecodedCache(max_bytes)
@@ -0,0 +1,163 @@
+import os
+import glob
+import json
+import argparse
+import numpy as np
+from PIL import Image
+import tqdm
+
+from pair_table import read_pairs
+from pair_sharding import add_shard_args, shard_pairs
+
+# Modality folder -> (pairs column it is keyed by, PIL mode)
+MODALITIES = {
+    "image": ("image", "RGB"),
+    "cloth": ("cloth", "RGB"),
+    "cloth-mask": ("cloth", "L"),
+    "agnostic-v3.2": ("image", "RGB"),
+    "image-densepose": ("image", "RGB"),
+}
+
+INDEX_FILE = "index.json"
+
+def index_file(rank=0, world_size=1):
+    """Index name for one rank's part of a store packed by several processes"""
+    return INDEX_FILE if world_size == 1 else f"index.rank{rank}.json"
+
+def ensure_dir(path):
+    """Create directory if it doesn't exist"""
+    os.makedirs(path, exist_ok=True)
+
+def pack_dataset(data_root, pairs_file, output_dir, img_size=(512, 384), shard_size=1024,
+                 rank=0, world_size=1, balance="size"):
+    """Decode and resize every modality once into memory-mapped uint8 shards.
+
+    Each modality gets its own ``<modality>_<n>.npy`` shards of shape
+    (rows, H, W, C). ``index.json`` maps every file name to its shard and row,
+    so a sample can be sliced straight out of the mapping without decoding.
+    Files missing on disk are left out of the index.
+
+    With world_size > 1 each rank packs its share of the pairs into
+    ``r<rank>_``-prefixed shards and ``index.rank<rank>.json``;
+    PackedSampleStore merges the per-rank indexes when it opens the directory.
+    """
+    ensure_dir(output_dir)
+    height, width = img_size
+    pairs = read_pairs(pairs_file)
+    pairs = [pairs[i] for i in shard_pairs(pairs, rank, world_size, data_root, MODALITIES, balance)]
+    prefix = "" if world_size == 1 else f"r{rank}_"
+    print(f"Packing {len(pairs)} pairs from {pairs_file} into {output_dir}")
+
+    index = {"img_size": [height, width], "modalities": {}}
+    for folder, (column, mode) in MODALITIES.items():
+        names = dict.fromkeys(im if column == "image" else c for im, c in pairs)
+        paths = [(name, os.path.join(data_root, folder, name)) for name in names]
+        paths = [(name, path) for name, path in paths if os.path.exists(path)]
+        channels = 3 if mode == "RGB" else 1
+        entries = {}
+        shards = []
+
+        for start in tqdm.tqdm(range(0, len(paths), shard_size), desc=folder):
+            chunk = paths[start:start + shard_size]
+            shard_name = f"{prefix}{folder}_{len(shards):03d}.npy"
+            shard = np.lib.format.open_memmap(
+                os.path.join(output_dir, shard_name), mode="w+",
+                dtype=np.uint8, shape=(len(chunk), height, width, channels))
+            for row, (name, path) in enumerate(chunk):
+                try:
+                    img = Image.open(path).convert(mode)
+                    img = img.resize((width, height), Image.BILINEAR)
+                    shard[row] = np.asarray(img).reshape(height, width, channels)
+                    entries[name] = [len(shards), row]
+                except Exception as e:
+                    print(f"Error packing {path}: {e}")
+            shard.flush()
+            del shard
+            shards.append(shard_name)
+
+        index["modalities"][folder] = {"channels": channels, "shards": shards, "entries": entries}
+        print(f"Packed {len(entries)}/{len(names)} {folder} files")
+
+    index_path = os.path.join(output_dir, index_file(rank, world_size))
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+    print(f"Wrote index to {index_path}")
+    return index
+
+class PackedSampleStore:
+    """Read-only view over shards written by ``pack_dataset``.
+
+    Shards are memory-mapped lazily on first use, so a store created in the
+    main process can be handed to DataLoader workers and each worker maps
+    the files itself instead of inheriting (or pickling) the arrays.
+    Indexes written by several ranks are merged into one view.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.img_size = None
+        self.modalities = {}
+        for path in sorted(glob.glob(os.path.join(store_dir, "index*.json"))):
+            with open(path, "r") as f:
+                self._merge(json.load(f), path)
+        if self.img_size is None:
+            raise FileNotFoundError(f"No packed index found in {store_dir}")
+        self._shards = {}
+
+    def _merge(self, index, path):
+        img_size = tuple(index["img_size"])
+        if self.img_size is not None and img_size != self.img_size:
+            raise ValueError(f"{path} was packed at {img_size}, expected {self.img_size}")
+        self.img_size = img_size
+        for folder, part in index["modalities"].items():
+            merged = self.modalities.setdefault(folder, {"channels": part["channels"], "shards": [], "entries": {}})
+            offset = len(merged["shards"])
+            merged["shards"].extend(part["shards"])
+            for name, (shard_id, row) in part["entries"].items():
+                merged["entries"].setdefault(name, [shard_id + offset, row])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
+
+    def has(self, folder, name):
+        return name in self.modalities[folder]["entries"]
+
+    def _shard(self, folder, shard_id):
+        key = (folder, shard_id)
+        if key not in self._shards:
+            path = os.path.join(self.store_dir, self.modalities[folder]["shards"][shard_id])
+            # Copy-on-write mapping: writable for torch.from_numpy, never written back
+            self._shards[key] = np.load(path, mmap_mode="c")
+        return self._shards[key]
+
+    def get(self, folder, name):
+        """Return the (H, W, C) uint8 view for a file, or None if it was not packed"""
+        entry = self.modalities[folder]["entries"].get(name)
+        if entry is None:
+            return None
+        shard_id, row = entry
+        return self._shard(folder, shard_id)[row]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Pack a StableVITON split into memory-mapped shards')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--pairs_file', type=str, default='test_pairs.txt', help='Path to pairs file')
+    parser.add_argument('--output_dir', type=str, default='packed/test', help='Directory to write shards to')
+    parser.add_argument('--img_size', type=int, nargs=2, default=[512, 384], help='Target height and width')
+    parser.add_argument('--shard_size', type=int, default=1024, help='Files per shard')
+    add_shard_args(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.data_root):
+        print(f"Error: Data directory {args.data_root} not found!")
+        return
+    pack_dataset(args.data_root, args.pairs_file, args.output_dir,
+                 img_size=tuple(args.img_size), shard_size=args.shard_size,
+                 rank=args.rank, world_size=args.world_size, balance=args.balance)
+
+if __name__ == "__main__":
+    main()
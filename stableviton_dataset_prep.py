@@ -1,52 +1,105 @@
 import os
 import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import cv2
 import numpy as np
 from PIL import Image, ImageOps
+import tqdm
+
+from cloth_masks import mask_image
+from openpose import read_pose
+from pose_maps import pose_map
+from pose_agnostic import AGNOSTIC_MASK_DIR, agnostic_mask_path
+
+AGNOSTIC_BLUR = 25
 
 def ensure_dir(path):
     """Create directory if it doesn't exist"""
     os.makedirs(path, exist_ok=True)
 
+def agnostic_box(height, width):
+    """Upper body region (simple rectangle) as (top, bottom, left, right)"""
+    # Adjust these values based on your specific images
+    return int(height * 0.15), int(height * 0.45), int(width * 0.25), int(width * 0.75)
+
+def blur_region(img_array, box, ksize=AGNOSTIC_BLUR):
+    """Gaussian-blur one rectangle of an (H, W, C) array in place.
+    
+    Only the rectangle padded by ksize // 2 is blurred, which gives the same
+    pixels inside the rectangle as blurring the whole image: the padding
+    covers the kernel, and at the image edge both reflect the same border.
+    """
+    top, bottom, left, right = box
+    height, width = img_array.shape[:2]
+    pad = ksize // 2
+    y0, y1 = max(0, top - pad), min(height, bottom + pad)
+    x0, x1 = max(0, left - pad), min(width, right + pad)
+    blurred = cv2.GaussianBlur(img_array[y0:y1, x0:x1], (ksize, ksize), 0)
+    img_array[top:bottom, left:right] = blurred[top - y0:bottom - y0, left - x0:right - x0]
+    return img_array
+
+def make_agnostic(img_array):
+    """Blur the clothing region of an RGB array in place and return its (H, W) uint8 mask"""
+    height, width = img_array.shape[:2]
+    top, bottom, left, right = box = agnostic_box(height, width)
+    blur_region(img_array, box)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    mask[top:bottom, left:right] = 255
+    return mask
+
 def create_agnostic_image(person_img_path, output_path):
     """Create an agnostic image (remove clothing region)"""
     # Load the person image
-    img = Image.open(person_img_path).convert('RGB')
-    img_array = np.array(img)
-    
-    # Estimate clothing region (upper body)
-    height, width = img_array.shape[:2]
-    
-    # Create a simple mask for the upper body area
-    mask = np.zeros((height, width), dtype=np.uint8)
-    
-    # Define upper body region (simple rectangle)
-    # Adjust these values based on your specific images
-    upper_y = int(height * 0.15)  # Start at 15% from top
-    lower_y = int(height * 0.45)  # End at 45% from top
-    left_x = int(width * 0.25)    # 25% from left
-    right_x = int(width * 0.75)   # 25% from right
-    
-    # Create the mask
-    mask[upper_y:lower_y, left_x:right_x] = 255
+    img_array = np.array(Image.open(person_img_path).convert('RGB'))
     
-    # Create a blurred version of the image
-    blurred = cv2.GaussianBlur(img_array, (25, 25), 0)
-    
-    # Replace the masked area with the blurred version
-    img_array_copy = img_array.copy()
-    img_array_copy[mask > 0] = blurred[mask > 0]
+    # Blur the upper body area in place
+    mask = make_agnostic(img_array)
     
     # Save the agnostic image
-    agnostic_img = Image.fromarray(img_array_copy)
-    agnostic_img.save(output_path)
+    Image.fromarray(img_array).save(output_path)
     
-    # Also create and return the mask
-    mask_img = Image.fromarray(mask)
-    return mask_img
+    # Also return the mask
+    return Image.fromarray(mask)
+
+def agnostic_job(job):
+    """Pool worker: write the agnostic image and mask for one person image"""
+    src, agnostic_path, mask_path = job
+    mask = create_agnostic_image(src, agnostic_path)
+    mask.save(mask_path)
+    return os.path.basename(src)
 
-def prepare_full_dataset(person_img_path, cloth_img_path):
-    """Prepare a complete dataset structure for StableVITON"""
+def prepare_agnostic_folder(data_root, image_dir="image", agnostic_dir="agnostic", mask_dir=AGNOSTIC_MASK_DIR,
+                            workers=None, overwrite=False):
+    """Write agnostic images and agnostic masks for every person image in <data_root>/<image_dir>.
+    
+    Images whose agnostic image and mask both exist are skipped unless overwrite is set.
+    """
+    src_dir = os.path.join(data_root, image_dir)
+    ensure_dir(os.path.join(data_root, agnostic_dir))
+    ensure_dir(os.path.join(data_root, mask_dir))
+    jobs = []
+    for fn in sorted(os.listdir(src_dir)):
+        if not fn.lower().endswith(('.jpg', '.jpeg', '.png')):
+            continue
+        agnostic_path = os.path.join(data_root, agnostic_dir, fn)
+        mask_path = agnostic_mask_path(data_root, fn, mask_dir)
+        if not overwrite and os.path.exists(agnostic_path) and os.path.exists(mask_path):
+            continue
+        jobs.append((os.path.join(src_dir, fn), agnostic_path, mask_path))
+    
+    print(f"Creating agnostic images for {len(jobs)} images in {src_dir}")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for _ in tqdm.tqdm(pool.map(agnostic_job, jobs, chunksize=16), total=len(jobs)):
+            pass
+    return len(jobs)
+
+def prepare_full_dataset(person_img_path, cloth_img_path, keypoints_path=None):
+    """Prepare a complete dataset structure for StableVITON
+
+    With keypoints_path (the person's OpenPose JSON), image-densepose is a
+    body-part map rendered from the keypoints instead of a grey placeholder.
+    """
     print("Preparing complete StableVITON dataset structure...")
     
     # Base directories
@@ -59,7 +112,7 @@ def prepare_full_dataset(person_img_path, cloth_img_path):
         os.path.join(data_test, "cloth"),
         os.path.join(data_test, "cloth-mask"),
         os.path.join(data_test, "agnostic"),
-        os.path.join(data_test, "agnostic-mask"),
+        os.path.join(data_test, AGNOSTIC_MASK_DIR),
         os.path.join(data_test, "image-densepose")
     ]
     
@@ -75,13 +128,14 @@ def prepare_full_dataset(person_img_path, cloth_img_path):
     dst_cloth = os.path.join(data_test, "cloth", cloth_filename)
     dst_cloth_mask = os.path.join(data_test, "cloth-mask", cloth_filename)
     dst_agnostic = os.path.join(data_test, "agnostic", person_filename)
-    dst_agnostic_mask = os.path.join(data_test, "agnostic-mask", person_filename)
+    dst_agnostic_mask = agnostic_mask_path(data_test, person_filename)
     dst_densepose = os.path.join(data_test, "image-densepose", person_filename)
     
     try:
         # Process person image
         person_img = Image.open(person_img_path)
         person_img = person_img.convert('RGB')
+        person_size = (person_img.height, person_img.width)
         person_img = person_img.resize((384, 512))  # Standard size for StableVITON
         person_img.save(dst_person)
         print(f"Saved person image to {dst_person}")
@@ -93,19 +147,9 @@ def prepare_full_dataset(person_img_path, cloth_img_path):
         cloth_img.save(dst_cloth)
         print(f"Saved cloth image to {dst_cloth}")
         
-        # Create cloth mask
-        if 'A' in cloth_img.getbands():  # Has alpha channel
-            r, g, b, a = cloth_img.split()
-            mask = a.point(lambda i: 255 if i > 0 else 0)
-        else:
-            # Create a simple white mask (assuming white background)
-            img_array = np.array(cloth_img)
-            # Simple thresholding - assuming white background
-            mask_array = np.all(img_array > 240, axis=2)
-            mask_array = ~mask_array  # Invert the mask
-            mask = Image.fromarray(mask_array.astype(np.uint8) * 255)
-        
-        mask = mask.convert('RGB')
+        # Create cloth mask (alpha if present, otherwise assume a white background); a fully
+        # opaque RGBA garment keeps its all-foreground alpha mask rather than going through "auto"
+        mask = mask_image(cloth_img, "alpha" if 'A' in cloth_img.getbands() else "white", alpha_threshold=0)
         mask.save(dst_cloth_mask)
         print(f"Saved cloth mask to {dst_cloth_mask}")
         
@@ -115,11 +159,16 @@ def prepare_full_dataset(person_img_path, cloth_img_path):
         print(f"Saved agnostic image to {dst_agnostic}")
         print(f"Saved agnostic mask to {dst_agnostic_mask}")
         
-        # Create a dummy densepose visualization
-        # This is normally created by a human parsing model, but we'll create a simple version
-        densepose_img = Image.new('RGB', (384, 512), (128, 128, 128))
-        densepose_img.save(dst_densepose)
-        print(f"Saved dummy densepose image to {dst_densepose}")
+        # Create a densepose stand-in
+        # This is normally created by a human parsing model; render the keypoints if we have them
+        if keypoints_path:
+            densepose_img = Image.fromarray(pose_map(read_pose(keypoints_path), (512, 384), person_size))
+            densepose_img.save(dst_densepose)
+            print(f"Saved pose map to {dst_densepose}")
+        else:
+            densepose_img = Image.new('RGB', (384, 512), (128, 128, 128))
+            densepose_img.save(dst_densepose)
+            print(f"Saved dummy densepose image to {dst_densepose}")
         
         # Create pairs.txt file
         pairs_path = os.path.join(data_test, "test_pairs.txt")
@@ -136,23 +185,11 @@ def prepare_full_dataset(person_img_path, cloth_img_path):
 def create_cloth_mask(cloth_img_path, output_path):
     """Create a cloth mask from the cloth image"""
     try:
-        # Load the cloth image
+        # Use the alpha channel if the image has one, otherwise assume a white background
         cloth_img = Image.open(cloth_img_path)
+        mask = mask_image(cloth_img, "alpha" if cloth_img.mode == 'RGBA' else "white", alpha_threshold=0)
         
-        # If image has alpha channel, use it for the mask
-        if cloth_img.mode == 'RGBA':
-            r, g, b, a = cloth_img.split()
-            mask = a.point(lambda i: 255 if i > 0 else 0)
-        else:
-            # Create a simple white mask (assuming white background)
-            img_array = np.array(cloth_img.convert('RGB'))
-            # Simple thresholding - assuming white background
-            mask_array = np.all(img_array > 240, axis=2)
-            mask_array = ~mask_array  # Invert the mask
-            mask = Image.fromarray(mask_array.astype(np.uint8) * 255)
-        
-        # Save the mask
-        mask = mask.convert('RGB')
+        # Save the mask as single-channel L
         mask.save(output_path)
         print(f"Saved cloth mask to {output_path}")
         return True
@@ -160,12 +197,25 @@ def create_cloth_mask(cloth_img_path, output_path):
         print(f"Error creating cloth mask: {e}")
         return False
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prepare StableVITON inputs")
+    parser.add_argument("person", nargs="?", help="Person image for a single-pair test dataset")
+    parser.add_argument("cloth", nargs="?", help="Cloth image for a single-pair test dataset")
+    parser.add_argument("--keypoints", type=str, default=None,
+                        help="Person's OpenPose JSON, to render image-densepose from instead of a grey placeholder")
+    parser.add_argument("--agnostic_root", type=str, default=None,
+                        help="Instead, write agnostic/ and agnostic-mask/ for every image in <root>/image")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --agnostic_root (default: CPU count)")
+    parser.add_argument("--overwrite", action="store_true", help="Regenerate existing agnostic images")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    args = parse_args()
+    if args.agnostic_root:
+        prepare_agnostic_folder(args.agnostic_root, workers=args.workers, overwrite=args.overwrite)
+    elif args.person and args.cloth:
+        prepare_full_dataset(args.person, args.cloth, args.keypoints)
+    else:
         print("Usage: python stableviton_dataset_prep.py <person_image> <cloth_image>")
+        print("       python stableviton_dataset_prep.py --agnostic_root <data_root>")
         sys.exit(1)
-    
-    person_img_path = sys.argv[1]
-    cloth_img_path = sys.argv[2]
-    
-    prepare_full_dataset(person_img_path, cloth_img_path) 
\ No newline at end of file
@@ -0,0 +1,115 @@
+import os
+import io
+import glob
+import json
+import tarfile
+import argparse
+import tqdm
+
+from sample_store import MODALITIES, ensure_dir
+from pair_table import read_pairs
+from pair_sharding import add_shard_args, shard_pairs
+
+INDEX_FILE = "shards.json"
+KEYPOINTS_FIELD = "keypoints.json"
+PAIR_FIELD = "pair.txt"
+
+def keypoints_path(data_root, img_fn):
+    """Path of the OpenPose file for a person image (00006_00.jpg -> 00006_00_keypoints.json)"""
+    return os.path.join(data_root, "openpose_json", os.path.splitext(img_fn)[0] + "_keypoints.json")
+
+def add_bytes(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+def write_shards(data_root, pairs_file, output_dir, pairs_per_shard=1000,
+                 rank=0, world_size=1, balance="size"):
+    """Group each pair's files into sequential-read tar shards.
+
+    Every pair becomes consecutive members sharing a ``<key>.`` prefix (its
+    line number in the pairs file): the pair names, each available modality
+    as its original encoded bytes (``<key>.<modality><ext>``) and its
+    OpenPose keypoints. ``shards.json`` lists the shards with their pair
+    counts. With world_size > 1 each rank writes its share of the pairs to
+    ``shard_r<rank>_*.tar`` and ``shards.rank<rank>.json``.
+    """
+    ensure_dir(output_dir)
+    pairs = read_pairs(pairs_file)
+    indices = shard_pairs(pairs, rank, world_size, data_root, MODALITIES, balance)
+    prefix = "shard_" if world_size == 1 else f"shard_r{rank}_"
+    print(f"Writing {len(indices)} pairs from {pairs_file} into {output_dir}")
+
+    shards = []
+    for start in tqdm.tqdm(range(0, len(indices), pairs_per_shard), desc="shards"):
+        chunk = indices[start:start + pairs_per_shard]
+        shard_name = f"{prefix}{len(shards):05d}.tar"
+        with tarfile.open(os.path.join(output_dir, shard_name), "w") as tar:
+            for pair_index in chunk:
+                img_fn, cloth_fn = pairs[pair_index]
+                key = f"{pair_index:07d}"
+                add_bytes(tar, f"{key}.{PAIR_FIELD}", f"{img_fn} {cloth_fn}".encode("utf-8"))
+                for folder, (column, _) in MODALITIES.items():
+                    fn = img_fn if column == "image" else cloth_fn
+                    path = os.path.join(data_root, folder, fn)
+                    if os.path.exists(path):
+                        tar.add(path, arcname=f"{key}.{folder}{os.path.splitext(fn)[1]}")
+                path = keypoints_path(data_root, img_fn)
+                if os.path.exists(path):
+                    tar.add(path, arcname=f"{key}.{KEYPOINTS_FIELD}")
+        shards.append({"file": shard_name, "pairs": len(chunk)})
+
+    index_name = INDEX_FILE if world_size == 1 else f"shards.rank{rank}.json"
+    with open(os.path.join(output_dir, index_name), "w") as f:
+        json.dump({"shards": shards}, f)
+    print(f"Wrote {len(shards)} shards to {output_dir}")
+    return shards
+
+def read_shard_index(shard_dir):
+    """List the shards in a directory, merging the indexes written by every rank"""
+    shards = []
+    for path in sorted(glob.glob(os.path.join(shard_dir, "shards*.json"))):
+        with open(path, "r") as f:
+            shards.extend(json.load(f)["shards"])
+    return shards
+
+def iter_shard(path):
+    """Stream a tar shard front to back, yielding (pair index, {field: bytes}) per pair"""
+    current_key = None
+    fields = {}
+    with tarfile.open(path, "r|") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            key, field = member.name.split(".", 1)
+            if key != current_key and fields:
+                yield int(current_key), fields
+                fields = {}
+            current_key = key
+            fields[field] = tar.extractfile(member).read()
+    if fields:
+        yield int(current_key), fields
+
+def split_field(field):
+    """'agnostic-v3.2.jpg' -> 'agnostic-v3.2'; 'keypoints.json' -> 'keypoints'"""
+    return field.rsplit(".", 1)[0]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Write a StableVITON split into sequential-read tar shards')
+    parser.add_argument('--data_root', type=str, default='test', help='Path to data directory (train or test)')
+    parser.add_argument('--pairs_file', type=str, default='test_pairs.txt', help='Path to pairs file')
+    parser.add_argument('--output_dir', type=str, default='shards/test', help='Directory to write shards to')
+    parser.add_argument('--pairs_per_shard', type=int, default=1000, help='Pairs per tar shard')
+    add_shard_args(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.data_root):
+        print(f"Error: Data directory {args.data_root} not found!")
+        return
+    write_shards(args.data_root, args.pairs_file, args.output_dir, args.pairs_per_shard,
+                 rank=args.rank, world_size=args.world_size, balance=args.balance)
+
+if __name__ == "__main__":
+    main()
@@ -6,26 +6,17 @@ import torch
 import torchvision.transforms as transforms
 from datetime import datetime
 
+from cloth_masks import mask_image
+
 def ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
 def create_mask_from_image(image_path, output_path):
     """Create a simple mask for the clothing item"""
     try:
-        # Open the image
+        # White where the clothing is (alpha > 100, i.e. not very transparent)
         img = Image.open(image_path).convert('RGBA')
-        width, height = img.size
-        
-        # Create a white mask where the clothing is (non-transparent areas)
-        mask = Image.new('L', (width, height), 0)
-        for y in range(height):
-            for x in range(width):
-                r, g, b, a = img.getpixel((x, y))
-                if a > 100:  # If not very transparent
-                    mask.putpixel((x, y), 255)
-        
-        # Save the mask
-        mask.save(output_path)
+        mask_image(img, "alpha").save(output_path)
         return True
     except Exception as e:
         print(f"Error creating mask: {e}")
@@ -1,10 +1,13 @@
 import os
-import sys
 import glob
+import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 from PIL import Image
 
+from pair_table import read_pairs
+from contact_sheet import pair_entries, write_contact_sheets
+
 def visualize_tryon_results(person_img_path, cloth_img_path, results_dir="results_custom"):
     """Create a visualization of the StableVITON virtual try-on results"""
     print("Visualizing StableVITON try-on results...")
@@ -103,19 +106,31 @@ def visualize_tryon_results(person_img_path, cloth_img_path, results_dir="result
     print(f"Visualization saved to {output_path}")
     return output_path
 
+def visualize_all_pairs(data_root, pairs_file, results_dir, output_dir):
+    """Tile every pair's person, cloth and result into contact sheets with an HTML index"""
+    pairs = read_pairs(pairs_file)
+    # Results land in <results_dir>/pair when StableVITON is run on paired data
+    pair_dir = os.path.join(results_dir, 'pair')
+    entries = pair_entries(data_root, pairs, pair_dir if os.path.isdir(pair_dir) else results_dir)
+    return write_contact_sheets(entries, ["person", "cloth", "result"], output_dir,
+                                title="StableVITON Virtual Try-On")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Visualize StableVITON virtual try-on results")
+    parser.add_argument("person", nargs="?", default="zz.png", help="Path to person image")
+    parser.add_argument("cloth", nargs="?", default="shirt.png", help="Path to clothing image")
+    parser.add_argument("results_dir", nargs="?", default="results_custom", help="StableVITON results directory")
+    parser.add_argument("--contact_sheet", type=str, default=None, metavar="OUTPUT_DIR",
+                        help="Tile every pair in --pairs_file with its result into contact sheets in OUTPUT_DIR")
+    parser.add_argument("--data_root", type=str, default="StableVITON/data/test", help="Data directory for --contact_sheet")
+    parser.add_argument("--pairs_file", type=str, default="StableVITON/data/test/test_pairs.txt", help="Pairs file for --contact_sheet")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    # Default values
-    person_img = "zz.png"
-    cloth_img = "shirt.png"
-    results_dir = "results_custom"
-    
-    # Override with command line args if provided
-    if len(sys.argv) > 1:
-        person_img = sys.argv[1]
-    if len(sys.argv) > 2:
-        cloth_img = sys.argv[2]
-    if len(sys.argv) > 3:
-        results_dir = sys.argv[3]
+    args = parse_args()
     
     # Visualize
-    visualize_tryon_results(person_img, cloth_img, results_dir) 
\ No newline at end of file
+    if args.contact_sheet:
+        visualize_all_pairs(args.data_root, args.pairs_file, args.results_dir, args.contact_sheet)
+    else:
+        visualize_tryon_results(args.person, args.cloth, args.results_dir)